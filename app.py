@@ -1,20 +1,25 @@
 import streamlit as st
-import requests
 import anthropic
-import base64
-from typing import Dict, List
-import time
-import hashlib
-from datetime import datetime, timedelta
-import re
+from contextlib import contextmanager
+from datetime import datetime
 
-# Page config
-st.set_page_config(
-    page_title="ENTROPY Documentation AI",
-    page_icon="🎲",
-    layout="wide",
-    initial_sidebar_state="expanded"
+from streamlit.errors import StreamlitAPIException
+
+from entropy_engine.cache import AnswerCache
+from entropy_engine.chatbot import EntropyDocsChatbot
+from entropy_engine.config import (
+    METRICS_PORT, POPULAR_QUESTIONS, SNAPSHOT_DIR, WEBHOOK_PORT, WEBHOOK_SECRET
 )
+from entropy_engine.events import EngineEvents
+from entropy_engine.llm import AsyncAnswerEngine, RateLimiter, TokenBudgeter
+from entropy_engine.metrics import Metrics, serve_metrics
+from entropy_engine.sources import CorpusSet, load_sources
+from entropy_engine.webhook import PushWebhook, serve_webhook
+
+USE_ASYNC_ENGINE = True
+STREAM_ANSWERS = True
+PREWARM_POPULAR_ANSWERS = False
+HISTORY_PAGE_SIZE = 10  # Exchanges rendered per rerun; older ones load a page at a time on request
 
 # Get API key from secrets
 def get_claude_api_key():
@@ -25,7 +30,7 @@ def get_claude_api_key():
         return None
 
 # Custom CSS
-st.markdown("""
+PAGE_CSS = """
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
     
@@ -186,6 +191,13 @@ st.markdown("""
         text-decoration: none;
     }
     
+    .message-sources {
+        font-family: 'Inter', sans-serif;
+        font-size: 0.9rem;
+        color: #e0e0e0;
+        margin: -0.5rem 0 1.5rem 0;
+    }
+    
     .questions-title {
         font-family: 'Inter', sans-serif;
         font-size: 1.3rem;
@@ -397,235 +409,165 @@ st.markdown("""
         }
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-class EntropyDocsChatbot:
-    def __init__(self, claude_api_key: str):
-        self.repo_owner = "justentropy-lol"
-        self.repo_name = "entropy-docs"
-        self.client = anthropic.Anthropic(api_key=claude_api_key)
-        self.documents_cache = {}
-        self.cache_timestamp = None
-        self.cache_duration = timedelta(hours=2)
-    
-    def is_cache_valid(self) -> bool:
-        if not self.cache_timestamp:
-            return False
-        return datetime.now() - self.cache_timestamp < self.cache_duration
-    
-    def fetch_entropy_docs(self) -> Dict[str, str]:
-        if self.is_cache_valid() and self.documents_cache:
-            return self.documents_cache
-        
-        base_url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}"
-        
-        try:
-            for branch in ['main', 'master']:
-                tree_url = f"{base_url}/git/trees/{branch}?recursive=1"
-                response = requests.get(tree_url)
-                
-                if response.status_code == 200:
-                    tree_data = response.json()
-                    break
-            else:
-                st.error("Could not access Entropy documentation repository.")
-                return {}
-            
-            doc_files = []
-            for item in tree_data.get('tree', []):
-                if item['type'] == 'blob':
-                    file_path = item['path']
-                    if any(file_path.endswith(ext) for ext in ['.md', '.txt', '.rst', '.mdx']):
-                        if any(important in file_path.lower() for important in 
-                               ['readme', 'getting-started', 'quickstart', 'installation', 'ashlar', 'mining', 'entropy', 'faq']):
-                            doc_files.insert(0, file_path)
-                        else:
-                            doc_files.append(file_path)
-            
-            documents = {}
-            
-            if not doc_files:
-                st.warning("No documentation files found in the Entropy docs repository.")
-                return {}
-            
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            for i, file_path in enumerate(doc_files):
-                status_text.text(f"Loading {file_path}...")
-                file_content = self.fetch_file_content(file_path)
-                if file_content:
-                    documents[file_path] = file_content
-                progress_bar.progress((i + 1) / len(doc_files))
-                time.sleep(0.1)
-            
-            progress_bar.empty()
-            status_text.empty()
-            
-            self.documents_cache = documents
-            self.cache_timestamp = datetime.now()
-            
-            return documents
-            
-        except Exception as e:
-            st.error(f"Error fetching Entropy documentation: {e}")
-            return {}
-    
-    def fetch_file_content(self, file_path: str) -> str:
-        url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/contents/{file_path}"
-        
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                content_data = response.json()
-                
-                size = content_data.get('size', 0)
-                if size > 500000:
-                    return None
-                
-                if content_data.get('encoding') == 'base64':
-                    content = base64.b64decode(content_data['content']).decode('utf-8')
-                    return content
-                    
-        except Exception:
-            pass
-        
-        return None
-    
-    def prepare_entropy_context(self, documents: Dict[str, str]) -> str:
-        if not documents:
-            return ""
-        
-        critical_files = []
-        ashlar_files = []
-        general_files = []
-        
-        for file_path, content in documents.items():
-            file_lower = file_path.lower()
-            if any(critical in file_lower for critical in ['readme', 'getting-started', 'quickstart']):
-                critical_files.append((file_path, content))
-            elif any(ashlar in file_lower for ashlar in ['ashlar', 'mining', 'device']):
-                ashlar_files.append((file_path, content))
-            else:
-                general_files.append((file_path, content))
-        
-        all_files = critical_files + ashlar_files + general_files
-        context_parts = []
-        current_chars = 0
-        max_chars = 150000
-        
-        for file_path, content in all_files:
-            file_section = f"=== {file_path} ===\n{content}\n\n"
-            
-            if current_chars + len(file_section) < max_chars:
-                context_parts.append(file_section)
-                current_chars += len(file_section)
-            else:
-                break
-        
-        return "\n".join(context_parts)
-    
-    def prepare_conversation_context(self, conversation_history: List[Dict]) -> str:
-        if not conversation_history:
-            return ""
-        
-        context_parts = []
-        for i, exchange in enumerate(conversation_history[-3:]):
-            context_parts.append(f"Previous Question {i+1}: {exchange['question']}")
-            
-            # Handle both old string format and new dict format
-            if isinstance(exchange['answer'], dict):
-                answer_text = exchange['answer']['text']
-            else:
-                answer_text = exchange['answer']
-            
-            context_parts.append(f"Previous Answer {i+1}: {answer_text[:500]}...")
-        
-        return "\n\n".join(context_parts)
-    
-    def extract_citations(self, response_text: str) -> tuple:
-        """Extract citations and return both formatted text and citation links"""
-        # Pattern to match file references like "According to README.md" or "As mentioned in getting-started.md"
-        file_pattern = r'((?:According to|As mentioned in|Based on|From|In)\s+)([a-zA-Z0-9_-]+\.(?:md|txt|rst|mdx))'
-        
-        citations = []
-        
-        def extract_citation(match):
-            prefix = match.group(1)
-            filename = match.group(2)
-            github_url = f"https://github.com/{self.repo_owner}/{self.repo_name}/blob/main/{filename}"
-            citations.append((filename, github_url))
-            return f'{prefix}**{filename}**'
-        
-        formatted_text = re.sub(file_pattern, extract_citation, response_text, flags=re.IGNORECASE)
-        return formatted_text, citations
-    
-    def answer_entropy_question(self, question: str, conversation_history: List[Dict] = None) -> str:
-        if not self.documents_cache or not self.is_cache_valid():
-            with st.spinner("Loading Entropy documentation..."):
-                self.documents_cache = self.fetch_entropy_docs()
-                
-            if not self.documents_cache:
-                return {"text": "Could not load Entropy documentation. Please try again later.", "citations": []}
-        
-        context = self.prepare_entropy_context(self.documents_cache)
-        conversation_context = self.prepare_conversation_context(conversation_history) if conversation_history else ""
-        
-        if not context:
-            return {"text": "No Entropy documentation content available.", "citations": []}
-        
-        system_prompt = f"""You are the official Entropy documentation assistant. You help users understand the Entropy project, which is a unique DePIN (Decentralized Physical Infrastructure Network) memecoin that mines "useless" entropy.
+def apply_page_style():
+    # Page config
+    st.set_page_config(
+        page_title="ENTROPY Documentation AI",
+        page_icon="🎲",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
 
-Your expertise covers:
-- Entropy project overview and philosophy
-- Ashlar mining devices and setup
-- $ENT token mechanics and mining
-- Community rules and guidelines
-- Technical aspects of entropy generation
-- DePIN concepts as they relate to Entropy
+class StreamlitEvents(EngineEvents):
+    """Engine events drawn into the current Streamlit script run"""
+    
+    def __init__(self):
+        self._progress_bar = None
+        self._status_text = None
+    
+    def error(self, message: str):
+        st.error(message)
+    
+    def warning(self, message: str):
+        st.warning(message)
+    
+    def progress(self, fraction: float, message: str = ""):
+        if self._progress_bar is None:
+            self._progress_bar = st.progress(0)
+            self._status_text = st.empty()
+        self._progress_bar.progress(fraction)
+        self._status_text.text(message)
+    
+    def progress_done(self):
+        if self._progress_bar is not None:
+            self._progress_bar.empty()
+            self._status_text.empty()
+            self._progress_bar = None
+            self._status_text = None
+    
+    @contextmanager
+    def busy(self, message: str):
+        with st.spinner(message):
+            yield
 
-CONVERSATION CONTEXT:
-You are having an ongoing conversation with the user. Here's the recent conversation history:
-{conversation_context}
+@st.cache_resource
+def get_shared_corpus() -> CorpusSet:
+    corpus = CorpusSet(load_sources(), SNAPSHOT_DIR)
+    # Sources are refreshed from background threads ahead of expiry, so no question waits on GitHub
+    corpus.start_scheduler()
+    if WEBHOOK_PORT:
+        # Pushes refresh the files they touch straight away; the schedule remains the fallback
+        serve_webhook(PushWebhook(corpus, secret=WEBHOOK_SECRET), WEBHOOK_PORT)
+    return corpus
 
-STRICT GUIDELINES:
-1. Answer ONLY using information from the Entropy documentation provided below
-2. If information isn't in the docs, clearly state "This information is not available in the Entropy documentation"
-3. ALWAYS cite specific files when referencing information using phrases like "According to README.md" or "As mentioned in getting-started.md"
-4. For follow-up questions, reference previous parts of the conversation when relevant
-5. If asked to explain something in simpler terms, break down complex concepts step-by-step
-6. If asked for more detail, provide deeper explanations from the documentation
-7. Embrace the unique nature of Entropy - it's meant to be "useless" and that's the point!
-8. Be helpful with setup instructions, mining guidance, and community rules
-9. Use the project's own terminology and maintain its playful tone where appropriate
-10. IMPORTANT: Always reference the specific documentation file you're citing from
+@st.cache_resource
+def get_claude_client(claude_api_key: str) -> anthropic.Anthropic:
+    return anthropic.Anthropic(api_key=claude_api_key, max_retries=0)
 
-Available Entropy Documentation:
-{context}
+@st.cache_resource
+def get_rate_limiter() -> RateLimiter:
+    # Every session shares the one CLAUDE_API_KEY, so they share its limits too
+    return RateLimiter()
 
-Remember: You are specifically here to help with Entropy - the project that mines "nothing" but creates community and value through that very nothingness. Use the conversation history to provide more contextual and helpful follow-up responses. Always cite the specific documentation files you reference."""
+@st.cache_resource
+def get_answer_cache() -> AnswerCache:
+    return AnswerCache()
 
-        try:
-            with st.spinner("Analyzing Entropy documentation..."):
-                response = self.client.messages.create(
-                    model="claude-3-5-sonnet-20241022",
-                    max_tokens=2500,
-                    system=system_prompt,
-                    messages=[{"role": "user", "content": question}]
-                )
-            
-            response_text = response.content[0].text
-            formatted_text, citations = self.extract_citations(response_text)
-            
-            # Return both the formatted text and citations
-            return {"text": formatted_text, "citations": citations}
-            
-        except anthropic.AuthenticationError:
-            return {"text": "Invalid Claude API key. Please check the API key configuration.", "citations": []}
-        except anthropic.RateLimitError:
-            return {"text": "Rate limit exceeded. Please wait a moment and try again.", "citations": []}
-        except Exception as e:
-            return {"text": f"Error generating response: {str(e)}", "citations": []}
+@st.cache_resource
+def get_token_budgeter() -> TokenBudgeter:
+    return TokenBudgeter()
+
+@st.cache_resource
+def get_metrics() -> Metrics:
+    metrics = Metrics()
+    corpus = get_shared_corpus()
+    answer_cache = get_answer_cache()
+    limiter = get_rate_limiter()
+    
+    def collect_footprint():
+        gauges = [(f"entropy_corpus_{name}", {}, value) for name, value in corpus.footprint().items()]
+        gauges.append(("entropy_answer_cache_entries", {}, len(answer_cache)))
+        gauges.append(("entropy_corpus_refresh_failures", {}, corpus.refresh_failures))
+        for stage in ("raw", "clean"):
+            if corpus.normalization:
+                gauges.append(("entropy_normalized_tokens", {"stage": stage}, corpus.normalization[f"{stage}_tokens"]))
+        limiter_stats = limiter.stats()
+        for name in ("queue_depth", "last_wait_seconds", "average_wait_seconds"):
+            gauges.append((f"entropy_rate_limiter_{name}", {}, limiter_stats[name]))
+        return gauges
+    
+    metrics.add_collector(collect_footprint)
+    if METRICS_PORT:
+        serve_metrics(metrics, METRICS_PORT)
+    return metrics
+
+@st.cache_resource
+def get_answer_engine(claude_api_key: str) -> AsyncAnswerEngine:
+    return AsyncAnswerEngine(
+        anthropic.AsyncAnthropic(api_key=claude_api_key, max_retries=0), get_rate_limiter(), get_metrics()
+    )
+
+def create_chatbot(claude_api_key: str, events: EngineEvents = None) -> EntropyDocsChatbot:
+    """A chatbot wired to the process-wide corpus, clients and caches"""
+    return EntropyDocsChatbot(
+        claude_api_key,
+        corpus=get_shared_corpus(),
+        client=get_claude_client(claude_api_key),
+        answer_cache=get_answer_cache(),
+        budgeter=get_token_budgeter(),
+        engine=get_answer_engine(claude_api_key) if USE_ASYNC_ENGINE else None,
+        limiter=get_rate_limiter(),
+        events=events,
+        metrics=get_metrics()
+    )
+
+@st.cache_resource
+def enable_answer_prewarm(claude_api_key: str) -> bool:
+    """Re-answer the popular questions into the shared answer cache after every corpus refresh"""
+    chatbot = create_chatbot(claude_api_key)
+    chatbot.corpus.add_listener(lambda corpus: chatbot.prewarm_answers(POPULAR_QUESTIONS))
+    if chatbot.corpus.documents:
+        chatbot.prewarm_answers(POPULAR_QUESTIONS)
+    return True
+
+def render_user_message(question: str) -> str:
+    return f"""
+    <div class="message user-message">
+        <div class="user-message-header">You asked:</div>
+        <div class="message-content">{question}</div>
+    </div>
+    """
+
+def render_assistant_message(answer_text: str) -> str:
+    return f"""
+    <div class="message assistant-message">
+        <div class="assistant-message-header">🎲 Entropy Response:</div>
+        <div class="message-content">{answer_text}</div>
+    </div>
+    """
+
+def render_exchange(exchange: dict) -> str:
+    """One exchange as a single HTML fragment, built once and kept on the exchange"""
+    if 'html' not in exchange:
+        # Handle both old string format and new dict format
+        if isinstance(exchange['answer'], dict):
+            answer_text = exchange['answer']['text']
+            citations = exchange['answer'].get('citations', [])
+        else:
+            answer_text = exchange['answer']
+            citations = []
+        
+        html = render_user_message(exchange['question']) + render_assistant_message(answer_text)
+        if citations:
+            links = "<br>".join(
+                f'🔗 <a href="{url}" target="_blank" class="citation-link">{filename}</a>' for filename, url in citations
+            )
+            html += f'<div class="message-sources"><strong>📖 Sources:</strong><br>{links}</div>'
+        exchange['html'] = html
+    return exchange['html']
 
 def create_sidebar():
     """Create sidebar with project links and information"""
@@ -668,13 +610,119 @@ def create_sidebar():
         </div>
         """, unsafe_allow_html=True)
 
+def rerun_chat_panel():
+    """Rerun only the chat panel when it is already rerunning on its own, otherwise the whole app"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+@st.fragment
+def chat_panel():
+    """Conversation, popular questions and input; interacting with them reruns only this fragment"""
+    
+    # Display conversation history, newest page only; each exchange is one prebuilt element
+    history = st.session_state.conversation_history
+    if history:
+        shown = st.session_state.setdefault('history_shown', HISTORY_PAGE_SIZE)
+        hidden = len(history) - shown
+        if hidden > 0 and st.button(f"⬆️ Show earlier messages ({hidden})", key="history_more"):
+            st.session_state.history_shown += HISTORY_PAGE_SIZE
+            rerun_chat_panel()
+        
+        for exchange in history[-shown:]:
+            st.markdown(render_exchange(exchange), unsafe_allow_html=True)
+        
+        # Clear conversation button
+        if st.button("🗑️ Clear Conversation", key="clear_conv"):
+            st.session_state.conversation_history = []
+            st.session_state.history_shown = HISTORY_PAGE_SIZE
+            rerun_chat_panel()
+    
+    else:
+        # Popular questions section (only show when no conversation)
+        st.markdown("""
+        <div class="questions-title">Popular Questions</div>
+        """, unsafe_allow_html=True)
+        
+        # Create question grid
+        cols = st.columns(2)
+        for i, question in enumerate(POPULAR_QUESTIONS):
+            with cols[i % 2]:
+                if st.button(question, key=f"q_{i}", use_container_width=True):
+                    st.session_state.current_question = question
+    
+    # The exchange being answered streams in here, below the history
+    live_exchange = st.container()
+    
+    # Chat input section
+    st.markdown('<div class="chat-input-container">', unsafe_allow_html=True)
+    st.markdown('<label class="input-label">Ask your question about Entropy:</label>', unsafe_allow_html=True)
+    
+    # Text input with Enter key submission
+    question = st.text_input(
+        "",
+        value=st.session_state.get('current_question', ''),
+        placeholder="e.g., How do I start mining entropy with my Ashlar device?",
+        key="question_input",
+        label_visibility="collapsed"
+    )
+    
+    st.markdown('<div class="input-hint">💡 Press Enter to submit your question, or ask follow-up questions for more details</div>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Handle question submission (both button and Enter key)
+    if question and (question != st.session_state.get('last_question', '')):
+        # Update last question to prevent re-submission
+        st.session_state.last_question = question
+        
+        on_text = None
+        if STREAM_ANSWERS:
+            with live_exchange:
+                st.markdown(render_user_message(question), unsafe_allow_html=True)
+                answer_placeholder = st.empty()
+                answer_placeholder.markdown(
+                    render_assistant_message("Analyzing Entropy documentation..."), unsafe_allow_html=True
+                )
+            
+            def on_text(partial_text: str):
+                answer_placeholder.markdown(render_assistant_message(f"{partial_text}▌"), unsafe_allow_html=True)
+        
+        # Get answer with conversation context
+        answer = st.session_state.entropy_chatbot.answer_entropy_question(
+            question, 
+            st.session_state.conversation_history,
+            on_text=on_text
+        )
+        
+        # Add to conversation history
+        exchange = {'question': question, 'answer': answer, 'timestamp': datetime.now()}
+        render_exchange(exchange)
+        st.session_state.conversation_history.append(exchange)
+        
+        # Clear current question and rerun to show updated conversation
+        if 'current_question' in st.session_state:
+            del st.session_state.current_question
+        
+        rerun_chat_panel()
+
 def main():
+    apply_page_style()
+    
     # Get API key from secrets
     claude_api_key = get_claude_api_key()
     
     # Create sidebar
     create_sidebar()
     
+    # Shared API queue, visible while questions are waiting on the rate limiter
+    limiter_stats = get_rate_limiter().stats()
+    if limiter_stats["queue_depth"]:
+        st.sidebar.caption(
+            f"⏳ {limiter_stats['queue_depth']} question(s) queued for Claude · "
+            f"average wait {limiter_stats['average_wait_seconds']:.1f}s"
+        )
+    
     # Initialize conversation history
     if 'conversation_history' not in st.session_state:
         st.session_state.conversation_history = []
@@ -704,10 +752,14 @@ def main():
         st.error("Claude API key not configured. Please contact the administrator.")
         return
     
+    if PREWARM_POPULAR_ANSWERS:
+        enable_answer_prewarm(claude_api_key)
+    
     # Initialize chatbot automatically
     if 'entropy_chatbot' not in st.session_state:
         try:
-            st.session_state.entropy_chatbot = EntropyDocsChatbot(claude_api_key)
+            st.session_state.entropy_chatbot = create_chatbot(claude_api_key, events=StreamlitEvents())
+            get_metrics().inc("entropy_sessions_total")
             st.success("✅ Entropy AI Assistant is ready!")
         except Exception as e:
             st.error(f"Failed to initialize: {e}")
@@ -717,108 +769,7 @@ def main():
     st.markdown('<div class="main-content">', unsafe_allow_html=True)
     
     if 'entropy_chatbot' in st.session_state:
-        
-        # Display conversation history
-        if st.session_state.conversation_history:
-            for exchange in st.session_state.conversation_history:
-                # User message
-                st.markdown(f"""
-                <div class="message user-message">
-                    <div class="user-message-header">You asked:</div>
-                    <div class="message-content">{exchange['question']}</div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Handle both old string format and new dict format
-                if isinstance(exchange['answer'], dict):
-                    answer_text = exchange['answer']['text']
-                    citations = exchange['answer'].get('citations', [])
-                else:
-                    answer_text = exchange['answer']
-                    citations = []
-                
-                # Assistant message
-                st.markdown(f"""
-                <div class="message assistant-message">
-                    <div class="assistant-message-header">🎲 Entropy Response:</div>
-                    <div class="message-content">{answer_text}</div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Display citation links if any
-                if citations:
-                    st.write("**📖 Sources:**")
-                    for filename, url in citations:
-                        st.markdown(f"🔗 [{filename}]({url})")
-            
-            # Clear conversation button
-            if st.button("🗑️ Clear Conversation", key="clear_conv"):
-                st.session_state.conversation_history = []
-                st.rerun()
-        
-        else:
-            # Popular questions section (only show when no conversation)
-            st.markdown("""
-            <div class="questions-title">Popular Questions</div>
-            """, unsafe_allow_html=True)
-            
-            entropy_questions = [
-                "How do I set up my Ashlar mining device?",
-                "What is the Entropy project and how does it work?",
-                "How do I earn $ENT tokens through mining?",
-                "What are the community rules I need to follow?",
-                "How much can I earn mining entropy?",
-                "What is the Jeeter Deleter rule?",
-                "How do I connect my Ashlar to the network?",
-                "What makes Entropy different from other crypto projects?"
-            ]
-            
-            # Create question grid
-            cols = st.columns(2)
-            for i, question in enumerate(entropy_questions):
-                with cols[i % 2]:
-                    if st.button(question, key=f"q_{i}", use_container_width=True):
-                        st.session_state.current_question = question
-        
-        # Chat input section
-        st.markdown('<div class="chat-input-container">', unsafe_allow_html=True)
-        st.markdown('<label class="input-label">Ask your question about Entropy:</label>', unsafe_allow_html=True)
-        
-        # Text input with Enter key submission
-        question = st.text_input(
-            "",
-            value=st.session_state.get('current_question', ''),
-            placeholder="e.g., How do I start mining entropy with my Ashlar device?",
-            key="question_input",
-            label_visibility="collapsed"
-        )
-        
-        st.markdown('<div class="input-hint">💡 Press Enter to submit your question, or ask follow-up questions for more details</div>', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Handle question submission (both button and Enter key)
-        if question and (question != st.session_state.get('last_question', '')):
-            # Update last question to prevent re-submission
-            st.session_state.last_question = question
-            
-            # Get answer with conversation context
-            answer = st.session_state.entropy_chatbot.answer_entropy_question(
-                question, 
-                st.session_state.conversation_history
-            )
-            
-            # Add to conversation history
-            st.session_state.conversation_history.append({
-                'question': question,
-                'answer': answer,
-                'timestamp': datetime.now()
-            })
-            
-            # Clear current question and rerun to show updated conversation
-            if 'current_question' in st.session_state:
-                del st.session_state.current_question
-            
-            st.rerun()
+        chat_panel()
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -0,0 +1,273 @@
+"""Local stand-ins for the GitHub and Claude APIs with configurable latency and corpus size"""
+import base64
+import hashlib
+import io
+import json
+import random
+import tarfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import urlparse
+
+WORDS = (
+    "entropy ashlar mining device network node token reward validator wallet community rule "
+    "setup install configure connect firmware power cable router dashboard stake earn jeeter "
+    "deleter randomness source hardware noise sample proof block chain account balance payout "
+    "troubleshoot reset update status light port address key secure backup recovery guide"
+).split()
+
+def synthetic_docs(file_count: int, file_chars: int = 2000, seed: int = 0) -> Dict[str, str]:
+    """A deterministic markdown corpus laid out like a docs repository"""
+    rng = random.Random(seed)
+    
+    def paragraph(length: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(max(1, length // 7)))
+    
+    docs = {}
+    for i in range(file_count):
+        if i == 0:
+            file_path = "README.md"
+        elif i == 1:
+            file_path = "getting-started.md"
+        else:
+            file_path = f"docs/section-{i // 100}/{rng.choice(WORDS)}-{i}.md"
+        
+        sections = []
+        remaining = file_chars
+        heading = 1
+        while remaining > 0:
+            body = paragraph(min(remaining, 600))
+            sections.append(f"{'#' if heading == 1 else '##'} {rng.choice(WORDS).title()} {heading}\n\n{body}\n")
+            remaining -= len(body)
+            heading += 1
+        docs[file_path] = "\n".join(sections)
+    return docs
+
+class FakeServer:
+    """Threaded HTTP server on a free localhost port; requests are held for `latency` seconds"""
+    
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # Headers and body go out as separate writes
+            
+            def log_message(self, *args):
+                pass
+            
+            def do_GET(self):
+                server._count()
+                server.handle_get(self)
+            
+            def do_POST(self):
+                server._count()
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                server.handle_post(self, json.loads(body or b"{}"))
+        
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+    
+    def _count(self):
+        with self._calls_lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+    
+    def start(self) -> 'FakeServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self) -> 'FakeServer':
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    @staticmethod
+    def send(handler: BaseHTTPRequestHandler, status: int, body: bytes = b"",
+             content_type: str = "application/json", headers: Dict[str, str] = None):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+    
+    def handle_get(self, handler: BaseHTTPRequestHandler):
+        self.send(handler, 404)
+    
+    def handle_post(self, handler: BaseHTTPRequestHandler, payload: Dict):
+        self.send(handler, 404)
+
+class FakeGitHub(FakeServer):
+    """Serves git/trees, contents and tarball endpoints for one repository"""
+    
+    def __init__(self, docs: Dict[str, str], owner: str = "bench", repo: str = "docs", latency: float = 0.0):
+        super().__init__(latency)
+        self.prefix = f"/repos/{owner}/{repo}"
+        self.set_docs(docs)
+    
+    def set_docs(self, docs: Dict[str, str]):
+        """Swap in a new corpus; the tree SHA, ETag and tarball follow"""
+        self.docs = dict(docs)
+        self.blob_shas = {path: hashlib.sha1(content.encode('utf-8')).hexdigest() for path, content in self.docs.items()}
+        tree_sha = hashlib.sha1(json.dumps(self.blob_shas, sort_keys=True).encode('utf-8')).hexdigest()
+        self.etag = f'"{tree_sha}"'
+        self.tree = json.dumps({
+            "sha": tree_sha,
+            "truncated": False,
+            "tree": [
+                {"path": path, "type": "blob", "sha": self.blob_shas[path], "size": len(content.encode('utf-8'))}
+                for path, content in self.docs.items()
+            ]
+        }).encode('utf-8')
+        self._tarball = None
+    
+    @property
+    def tarball(self) -> bytes:
+        if self._tarball is None:
+            buffer = io.BytesIO()
+            with tarfile.open(fileobj=buffer, mode="w:gz", compresslevel=1) as archive:
+                for path, content in self.docs.items():
+                    data = content.encode('utf-8')
+                    member = tarfile.TarInfo(f"bench-docs-{self.etag[1:8]}/{path}")
+                    member.size = len(data)
+                    archive.addfile(member, io.BytesIO(data))
+            self._tarball = buffer.getvalue()
+        return self._tarball
+    
+    def handle_get(self, handler: BaseHTTPRequestHandler):
+        path = urlparse(handler.path).path
+        if not path.startswith(self.prefix):
+            return self.send(handler, 404)
+        path = path[len(self.prefix):]
+        
+        if path.startswith("/git/trees/"):
+            if handler.headers.get("If-None-Match") == self.etag:
+                return self.send(handler, 304, headers={"ETag": self.etag})
+            return self.send(handler, 200, self.tree, headers={"ETag": self.etag})
+        
+        if path.startswith("/tarball/"):
+            return self.send(handler, 200, self.tarball, "application/gzip")
+        
+        if path.startswith("/contents/"):
+            file_path = path[len("/contents/"):]
+            if file_path not in self.docs:
+                return self.send(handler, 404)
+            data = self.docs[file_path].encode('utf-8')
+            return self.send(handler, 200, json.dumps({
+                "path": file_path,
+                "sha": self.blob_shas[file_path],
+                "size": len(data),
+                "encoding": "base64",
+                "content": base64.b64encode(data).decode('ascii')
+            }).encode('utf-8'))
+        
+        self.send(handler, 404)
+
+class FakeClaude(FakeServer):
+    """Messages endpoint that answers after `latency` seconds, streaming `tokens` chunks `token_delay` apart
+    
+    Usage reports prompt-cache reads and writes as the API does: the prompt up to its last
+    cache_control block is written on first sight and read back by later requests that repeat it.
+    """
+    MIN_CACHEABLE_TOKENS = 1024
+    
+    def __init__(self, latency: float = 0.0, tokens: int = 50, token_delay: float = 0.0,
+                 answer: str = "According to README.md, plug the Ashlar into power and connect it to your router."):
+        super().__init__(latency)
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.answer = answer
+        self.cached_prefixes = set()
+        self._cache_lock = threading.Lock()
+    
+    def cache_usage(self, payload: Dict) -> Dict:
+        system = payload.get("system") or []
+        blocks = [{"type": "text", "text": system}] if isinstance(system, str) else list(system)
+        for message in payload.get("messages", []):
+            content = message["content"]
+            blocks += [{"type": "text", "text": content}] if isinstance(content, str) else content
+        
+        total = len(json.dumps(payload)) // 4
+        breakpoints = [position for position, block in enumerate(blocks, 1) if block.get("cache_control")]
+        if not breakpoints:
+            return {"input_tokens": total}
+        prefix = payload.get("model", "") + json.dumps(blocks[:breakpoints[-1]], sort_keys=True)
+        prefix_tokens = len(prefix) // 4
+        if prefix_tokens < self.MIN_CACHEABLE_TOKENS:
+            return {"input_tokens": total}
+        
+        with self._cache_lock:
+            hit = prefix in self.cached_prefixes
+            self.cached_prefixes.add(prefix)
+        kind = "cache_read_input_tokens" if hit else "cache_creation_input_tokens"
+        return {"input_tokens": max(0, total - prefix_tokens), kind: prefix_tokens}
+    
+    def answer_chunks(self) -> list:
+        words = self.answer.split(" ")
+        chunk_count = max(1, min(self.tokens, len(words)))
+        size = -(-len(words) // chunk_count)
+        return [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+    
+    def message(self, payload: Dict, text: str) -> Dict:
+        return {
+            "id": "msg_bench",
+            "type": "message",
+            "role": "assistant",
+            "model": payload.get("model", "bench"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {**self.cache_usage(payload), "output_tokens": self.tokens}
+        }
+    
+    def handle_post(self, handler: BaseHTTPRequestHandler, payload: Dict):
+        if not urlparse(handler.path).path.endswith("/messages"):
+            return self.send(handler, 404)
+        
+        if not payload.get("stream"):
+            return self.send(handler, 200, json.dumps(self.message(payload, self.answer)).encode('utf-8'))
+        
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+        
+        def event(name: str, data: Dict):
+            handler.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+            handler.wfile.flush()
+        
+        start = self.message(payload, "")
+        start["content"] = []
+        start["stop_reason"] = None
+        event("message_start", {"type": "message_start", "message": start})
+        event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        for chunk in self.answer_chunks():
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}})
+        event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                "usage": {"output_tokens": self.tokens}})
+        event("message_stop", {"type": "message_stop"})
@@ -0,0 +1,266 @@
+"""Time the engine's stages against local GitHub and Claude stand-ins
+
+    python -m benchmarks.run --files 10 100 1000 10000 --sessions 16 --output bench.json
+
+Every stage is reported as count/mean/p50/p95/p99/max in milliseconds, per corpus size, as
+JSON, so runs can be diffed to catch regressions and to see how each stage scales. Answers are
+timed with a bare chatbot ("plain") and wired as app.create_chatbot wires it ("app": the async
+answer engine, rate limiter, answer cache and token budgeter shared by every session); stages
+and counters of the app wiring carry an "_app" suffix.
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+import anthropic
+
+from entropy_engine import (
+    AnswerCache, AsyncAnswerEngine, DocsCorpus, DocsFetcher, EngineEvents, EntropyDocsChatbot, Metrics, RateLimiter,
+    TokenBudgeter
+)
+
+from .fakes import WORDS, FakeClaude, FakeGitHub, synthetic_docs
+
+OWNER = "bench"
+REPO = "docs"
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(samples: List[float]) -> Dict:
+    values = sorted(samples)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+class Timings:
+    """Samples in seconds, collected per stage; safe to record from several threads"""
+    
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+    
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+    
+    @contextmanager
+    def time(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+    
+    def summary(self) -> Dict:
+        return {stage: summarize(samples) for stage, samples in self.samples.items()}
+
+def make_questions(count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [f"How do I {rng.choice(WORDS)} the {rng.choice(WORDS)} {rng.choice(WORDS)}?" for _ in range(count)]
+
+def make_answers(count: int, seed: int = 2) -> List[str]:
+    """Answer-shaped text with a few citation phrases mixed into ordinary prose"""
+    rng = random.Random(seed)
+    answers = []
+    for _ in range(count):
+        sentences = []
+        for _ in range(12):
+            sentence = " ".join(rng.choice(WORDS) for _ in range(14)) + "."
+            if rng.random() < 0.3:
+                sentence = f"According to {rng.choice(WORDS)}-guide.md, {sentence}"
+            sentences.append(sentence)
+        answers.append(" ".join(sentences))
+    return answers
+
+def bench_fetch(github: FakeGitHub, ingest_mode: str, runs: int, timings: Timings, events: EngineEvents):
+    """Cold downloads into a fresh corpus, then a refresh of the unchanged tree (304)"""
+    for _ in range(runs):
+        corpus = DocsCorpus(OWNER, REPO, ingest_mode=ingest_mode)
+        fetcher = DocsFetcher(corpus, api_url=github.url)
+        with timings.time(f"fetch_{ingest_mode}"):
+            documents = fetcher.fetch_entropy_docs(events)
+        if len(documents) != len(github.docs):
+            raise RuntimeError(f"{ingest_mode} fetch returned {len(documents)} of {len(github.docs)} files")
+        
+        corpus.get_documents(lambda _events: documents, events)
+        with timings.time("refresh_unchanged"):
+            fetcher.fetch_entropy_docs(events)
+
+def bench_sessions(make_chatbot: Callable[[], EntropyDocsChatbot], sessions: int, questions: List[str],
+                   timings: Timings, suffix: str = "") -> Dict:
+    """Concurrent conversations, each streaming its answers and keeping its own history"""
+    errors = []
+    
+    def session(offset: int):
+        chatbot = make_chatbot()
+        history = []
+        for i in range(len(questions)):
+            question = questions[(offset + i) % len(questions)]
+            started = time.perf_counter()
+            first_text = []
+            
+            def on_text(text: str):
+                if not first_text:
+                    first_text.append(time.perf_counter() - started)
+            
+            answer = chatbot.answer_entropy_question(question, history, on_text)
+            timings.record("session_answer" + suffix, time.perf_counter() - started)
+            if first_text:
+                timings.record("session_first_text" + suffix, first_text[0])
+            if not answer["citations"]:
+                errors.append(answer["text"])
+            history.append({"question": question, "answer": answer})
+    
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(i,), name=f"session-{i}") for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    
+    answered = sessions * len(questions)
+    return {
+        "sessions": sessions,
+        "answers": answered,
+        "errors": len(errors),
+        "wall_s": round(wall, 3),
+        "answers_per_s": round(answered / wall, 2) if wall else None,
+    }
+
+def bench_size(args: argparse.Namespace, file_count: int, claude: FakeClaude) -> Dict:
+    timings = Timings()
+    events = EngineEvents()
+    docs = synthetic_docs(file_count, args.file_chars)
+    
+    with FakeGitHub(docs, OWNER, REPO, latency=args.github_latency) as github:
+        for ingest_mode in args.ingest:
+            bench_fetch(github, ingest_mode, args.fetch_runs, timings, events)
+        github_calls = github.calls
+    
+    corpus = DocsCorpus(OWNER, REPO)
+    for _ in range(args.fetch_runs):
+        with timings.time("build_index"):
+            corpus.build_index(docs)
+    corpus.get_documents(lambda _events: dict(docs), events)
+    
+    # One client and corpus for every chatbot, as the app shares them between sessions
+    client = anthropic.Anthropic(api_key="bench", base_url=claude.url, max_retries=0)
+    questions = make_questions(args.questions)
+    
+    chatbot = EntropyDocsChatbot("bench", corpus=corpus, client=client, events=events, metrics=Metrics(log_json=False))
+    for _ in range(args.repeat):
+        for question in questions:
+            with timings.time("prepare_entropy_context"):
+                chatbot.prepare_entropy_context(corpus.documents, question)
+    
+    for answer in make_answers(args.repeat * len(questions)):
+        with timings.time("extract_citations"):
+            chatbot.extract_citations(answer)
+    
+    result = {
+        "files": file_count,
+        "corpus_chars": sum(len(content) for content in docs.values()),
+        "chunks": len(corpus.index.chunks) if corpus.index else 0,
+        "github_calls": github_calls,
+    }
+    for wiring in args.wiring:
+        suffix = "" if wiring == "plain" else f"_{wiring}"
+        metrics = Metrics(log_json=False)
+        make_chatbot = chatbot_factory(wiring, args, corpus, client, claude, events, metrics)
+        
+        chatbot = make_chatbot()
+        for question in questions:
+            with timings.time("answer_entropy_question" + suffix):
+                chatbot.answer_entropy_question(question)
+        
+        result["concurrency" + suffix] = bench_sessions(make_chatbot, args.sessions, questions, timings, suffix)
+        # Prompt-cache reads against writes show whether the cached prefix is being reused
+        result["llm_tokens" + suffix] = {
+            counter["labels"]["kind"]: counter["value"]
+            for counter in metrics.snapshot()["counters"] if counter["name"] == "entropy_llm_tokens_total"
+        }
+    
+    result["stages"] = timings.summary()
+    return result
+
+def chatbot_factory(wiring: str, args: argparse.Namespace, corpus: DocsCorpus, client: anthropic.Anthropic,
+                    claude: FakeClaude, events: EngineEvents, metrics: Metrics) -> Callable[[], EntropyDocsChatbot]:
+    """New chatbots for each session, sharing what the app shares between sessions"""
+    if wiring == "plain":
+        return lambda: EntropyDocsChatbot("bench", corpus=corpus, client=client, events=events, metrics=metrics)
+    
+    # As app.create_chatbot with USE_ASYNC_ENGINE, one of each per process
+    limiter = RateLimiter(args.rate_limit_rpm, args.rate_limit_tpm)
+    answer_cache = AnswerCache()
+    budgeter = TokenBudgeter()
+    engine = AsyncAnswerEngine(
+        anthropic.AsyncAnthropic(api_key="bench", base_url=claude.url, max_retries=0), limiter, metrics
+    )
+    return lambda: EntropyDocsChatbot(
+        "bench", corpus=corpus, client=client, answer_cache=answer_cache, budgeter=budgeter, engine=engine,
+        limiter=limiter, events=events, metrics=metrics
+    )
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 100, 1000], help="corpus sizes to run")
+    parser.add_argument("--file-chars", type=int, default=2000, help="approximate size of each doc file")
+    parser.add_argument("--ingest", nargs="+", choices=["archive", "files"], default=["archive", "files"],
+                        help="ingestion modes to time")
+    parser.add_argument("--fetch-runs", type=int, default=3, help="cold fetches per ingestion mode")
+    parser.add_argument("--questions", type=int, default=20, help="distinct questions per stage")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the questions for in-process stages")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent conversations")
+    parser.add_argument("--wiring", nargs="+", choices=["plain", "app"], default=["plain", "app"],
+                        help="chatbot set-ups to answer with")
+    parser.add_argument("--rate-limit-rpm", type=int, default=100000,
+                        help="requests per minute for the app wiring's rate limiter (the app uses RATE_LIMIT_RPM)")
+    parser.add_argument("--rate-limit-tpm", type=int, default=10 ** 9,
+                        help="input tokens per minute for the app wiring's rate limiter (the app uses RATE_LIMIT_INPUT_TPM)")
+    parser.add_argument("--github-latency", type=float, default=0.0, help="seconds added to every GitHub request")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds before the first answer token")
+    parser.add_argument("--llm-tokens", type=int, default=40, help="streamed chunks per answer")
+    parser.add_argument("--llm-token-delay", type=float, default=0.001, help="seconds between streamed chunks")
+    parser.add_argument("--output", default="-", help="file to write the JSON report to (default: stdout)")
+    args = parser.parse_args(argv)
+    
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {name: value for name, value in vars(args).items() if name != "output"},
+        "results": [],
+    }
+    
+    with FakeClaude(args.llm_latency, args.llm_tokens, args.llm_token_delay) as claude:
+        for file_count in args.files:
+            report["results"].append(bench_size(args, file_count, claude))
+            print(f"benchmarked {file_count} files", file=sys.stderr)
+    
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""Headless core of the Entropy documentation assistant: ingestion, retrieval and answering
+
+Nothing here imports Streamlit. Submodules are imported on first attribute access, so
+``import entropy_engine`` stays cheap and a worker only pays for the parts it uses.
+"""
+import importlib
+
+_EXPORTS = {
+    'AnswerCache': 'cache',
+    'AsyncAnswerEngine': 'llm',
+    'ConversationMemory': 'memory',
+    'CorpusSet': 'sources',
+    'BM25Index': 'retrieval',
+    'DenseIndex': 'retrieval',
+    'DocsCorpus': 'corpus',
+    'DocsFetcher': 'github',
+    'EngineEvents': 'events',
+    'EntropyDocsChatbot': 'chatbot',
+    'Metrics': 'metrics',
+    'PushWebhook': 'webhook',
+    'QueryRouter': 'router',
+    'RateLimiter': 'llm',
+    'RetrievalIndex': 'retrieval',
+    'Route': 'router',
+    'ShardedIndex': 'retrieval',
+    'SnapshotStore': 'snapshot',
+    'Source': 'sources',
+    'TokenBudgeter': 'llm',
+    'answer_batch': 'batch',
+    'chunk_document': 'retrieval',
+    'corpus_version': 'corpus',
+    'load_sources': 'sources',
+    'normalize_question': 'cache',
+    'serve_metrics': 'metrics',
+    'serve_webhook': 'webhook',
+    'tokenize': 'retrieval',
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
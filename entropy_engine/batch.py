@@ -0,0 +1,135 @@
+"""Answer a file of questions offline against a single corpus load
+
+    python -m entropy_engine.batch questions.jsonl answers.jsonl --workers 8
+
+Each input line is a JSON object with a "question" and optionally an "id" and a "history"
+(earlier {"question", "answer"} exchanges); a bare JSON string is taken as the question.
+Each output line echoes the id and question alongside the answer text, its citations, the
+per-item timings in milliseconds and, when the item failed, the error.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List
+
+from .chatbot import EntropyDocsChatbot
+from .config import BATCH_WORKERS, SNAPSHOT_DIR
+from .llm import RateLimiter
+from .sources import CorpusSet, load_sources
+
+def read_questions(path: str) -> List[Dict]:
+    items = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            item.setdefault("id", line_number)
+            items.append(item)
+    return items
+
+def answer_batch(chatbot: EntropyDocsChatbot, items: List[Dict], workers: int = BATCH_WORKERS) -> Iterator[Dict]:
+    """Answer every item, yielding results in input order as they complete
+    
+    The corpus is refreshed once, up front, and every item is answered against that one
+    version (documents, index, citations) even if a refresh publishes another meanwhile. Every
+    prompt is built before any Claude call; only those calls run on the worker pool, paced by
+    the chatbot's rate limiter.
+    """
+    corpus = chatbot.corpus
+    if not corpus.refresh_now(chatbot.fetcher.fetch_entropy_docs if chatbot.fetcher else None, chatbot.events):
+        logging.warning("Could not refresh the corpus; answering from version %s", corpus.version)
+    state = corpus.state
+    documents = state.documents
+    if not documents:
+        raise RuntimeError("Could not load Entropy documentation")
+    
+    prepared = []
+    for item in items:
+        started = time.perf_counter()
+        result = {"id": item["id"], "question": item["question"]}
+        route = chatbot.route_question(item["question"], item.get("history"), state.index)
+        if route.reply is not None:
+            request = None
+            result.update(answer=route.reply, citations=[])
+        else:
+            request = chatbot.prepare_request(documents, item["question"], item.get("history"),
+                                              chatbot.model_tier(route), state.index)
+            if request is None:
+                result["error"] = "No Entropy documentation content available."
+        result["timing"] = {"prepare_ms": round((time.perf_counter() - started) * 1000, 1)}
+        prepared.append((item, request, result))
+    
+    def run(entry: tuple) -> Dict:
+        item, request, result = entry
+        if request is None:
+            return result
+        
+        # Only first-turn questions are shared, as in answer_entropy_question
+        cache_key = None
+        if chatbot.answer_cache is not None and not item.get("history"):
+            cache_key = chatbot.answer_cache_key(item["question"], state.version)
+            cached_answer = chatbot.answer_cache.get(cache_key)
+            if cached_answer:
+                result.update(answer=cached_answer["text"], citations=cached_answer["citations"], cached=True)
+                result["timing"]["answer_ms"] = 0.0
+                return result
+        
+        started = time.perf_counter()
+        try:
+            formatted_text, citations = chatbot.extract_citations(
+                chatbot.generate_answer(request), chatbot.citation_scanner(state.citations)
+            )
+            result.update(answer=formatted_text, citations=citations)
+            if cache_key:
+                chatbot.answer_cache.put(cache_key, {"text": formatted_text, "citations": citations})
+        except Exception as e:
+            result["error"] = str(e)
+        result["timing"]["answer_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-answer") as executor:
+        yield from executor.map(run, prepared)
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m entropy_engine.batch", description=__doc__.splitlines()[0])
+    parser.add_argument("questions", help="JSONL file of questions")
+    parser.add_argument("answers", nargs="?", default="-", help="JSONL file to write answers to (default: stdout)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="concurrent Claude requests")
+    parser.add_argument("--api-key", default=os.environ.get("CLAUDE_API_KEY") or os.environ.get("ANTHROPIC_API_KEY"),
+                        help="Claude API key (default: $CLAUDE_API_KEY or $ANTHROPIC_API_KEY)")
+    args = parser.parse_args(argv)
+    
+    if not args.api_key:
+        parser.error("no Claude API key; pass --api-key or set CLAUDE_API_KEY")
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    chatbot = EntropyDocsChatbot(
+        args.api_key,
+        corpus=CorpusSet(load_sources(), SNAPSHOT_DIR),
+        limiter=RateLimiter()
+    )
+    items = read_questions(args.questions)
+    
+    failed = 0
+    out = sys.stdout if args.answers == "-" else open(args.answers, "w", encoding="utf-8")
+    try:
+        for result in answer_batch(chatbot, items, args.workers):
+            failed += "error" in result
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    
+    logging.info("Answered %d of %d questions", len(items) - failed, len(items))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
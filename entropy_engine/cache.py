@@ -0,0 +1,44 @@
+"""Process-wide answer cache"""
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict
+
+from .config import ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL
+
+def normalize_question(question: str) -> str:
+    return " ".join(re.sub(r"[^\w$\s]", " ", question.lower()).split())
+
+class AnswerCache:
+    """Process-wide LRU cache of first-turn answers, keyed by normalized question and corpus version"""
+    
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: timedelta = ANSWER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: tuple) -> Dict:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            stored_at, answer = entry
+            if datetime.now() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return dict(answer)
+    
+    def put(self, key: tuple, answer: Dict):
+        with self._lock:
+            self._entries[key] = (datetime.now(), dict(answer))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
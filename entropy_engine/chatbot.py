@@ -0,0 +1,464 @@
+"""Question answering over the shared corpus"""
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Union
+
+from .cache import AnswerCache, normalize_question
+from .citations import CitationIndex, CitationScanner
+from .config import (
+    CACHED_CONTEXT_TOKENS, CALIBRATE_TOKEN_ESTIMATE, CLAUDE_MODEL, MAX_ANSWER_TOKENS, MAX_RETRIES, MODEL_TIERS,
+    RETRIEVAL_CANDIDATES, ROUTE_QUERIES, STREAM_UPDATE_INTERVAL, SUMMARIZE_WITH_CLAUDE,
+    SUMMARY_MODEL, SUMMARY_TOKEN_BUDGET
+)
+from .corpus import DocsCorpus
+from .events import EngineEvents
+from .github import DocsFetcher
+from .llm import AsyncAnswerEngine, RateLimiter, TokenBudgeter, is_rate_limit, is_retryable, retry_delay
+from .memory import ConversationMemory, exchange_texts
+from .metrics import BYTE_BUCKETS, Metrics
+from .prompts import ENTROPY_INSTRUCTIONS, SUMMARY_INSTRUCTIONS
+from .retrieval import RetrievalIndex
+from .router import QueryRouter, Route
+
+if TYPE_CHECKING:
+    import anthropic
+    
+    from .sources import CorpusSet
+
+class EntropyDocsChatbot:
+    def __init__(self, claude_api_key: str, corpus: Union[DocsCorpus, 'CorpusSet'] = None, client: 'anthropic.Anthropic' = None,
+                 answer_cache: AnswerCache = None, budgeter: TokenBudgeter = None,
+                 engine: AsyncAnswerEngine = None, limiter: RateLimiter = None, events: EngineEvents = None,
+                 fetcher: DocsFetcher = None, metrics: Metrics = None, router: QueryRouter = None):
+        # Only references to process-wide state live here; the conversation
+        # itself is kept by the caller (st.session_state in the app)
+        if corpus is None:
+            from .sources import CorpusSet, load_sources  # Only the default corpus needs the source list
+            
+            corpus = CorpusSet(load_sources())
+        self.corpus = corpus
+        self.repo_owner = self.corpus.repo_owner
+        self.repo_name = self.corpus.repo_name
+        self._claude_api_key = claude_api_key
+        self._client = client
+        if fetcher is None and isinstance(self.corpus, DocsCorpus):
+            fetcher = DocsFetcher(self.corpus)
+        # A CorpusSet fetches each source with its own fetcher
+        self.fetcher = fetcher
+        self.events = events or EngineEvents()
+        self.answer_cache = answer_cache
+        self.budgeter = budgeter or TokenBudgeter()
+        self.engine = engine
+        self.limiter = limiter
+        self.metrics = metrics or Metrics()
+        self.router = router or (QueryRouter() if ROUTE_QUERIES else None)
+        self.memory = ConversationMemory(self.budgeter, self.summarize_conversation if SUMMARIZE_WITH_CLAUDE else None)
+        self._prewarm_lock = threading.Lock()
+        self._stable_context = (None, "", frozenset())  # (index, text, chunk ids) of the cached prompt prefix
+    
+    @property
+    def client(self) -> 'anthropic.Anthropic':
+        # Created on first use so ingestion and retrieval never import the SDK
+        if self._client is None:
+            import anthropic
+            
+            # Retries are ours (see generate_answer) so they can coordinate with the rate limiter
+            self._client = anthropic.Anthropic(api_key=self._claude_api_key, max_retries=0)
+        return self._client
+    
+    @property
+    def documents_cache(self) -> Dict[str, str]:
+        return self.corpus.documents
+    
+    def is_cache_valid(self) -> bool:
+        return self.corpus.is_valid()
+    
+    def load_documents(self) -> Dict[str, str]:
+        return self.corpus.get_documents(self.fetcher.fetch_entropy_docs if self.fetcher else None, self.events)
+    
+    def fetch_entropy_docs(self) -> Dict[str, str]:
+        if self.fetcher is None:
+            return self.load_documents()
+        return self.fetcher.fetch_entropy_docs(self.events)
+    
+    def prepare_entropy_context(self, documents: Dict[str, str], question: str = None, budget: int = None,
+                                index: RetrievalIndex = None, exclude: frozenset = frozenset()) -> str:
+        """Documentation for the prompt; index must come from the same corpus state as documents"""
+        if not documents:
+            return ""
+        
+        if budget is None:
+            budget = self.budgeter.documentation_budget([ENTROPY_INSTRUCTIONS, question or ""], MAX_ANSWER_TOKENS)
+        
+        if index is None:
+            index = self.corpus.index
+        if question and index and index.chunks:
+            return self.prepare_retrieved_context(index, question, budget, exclude)
+        
+        critical_files = []
+        ashlar_files = []
+        general_files = []
+        
+        for file_path, content in documents.items():
+            file_lower = file_path.lower()
+            if any(critical in file_lower for critical in ['readme', 'getting-started', 'quickstart']):
+                critical_files.append((file_path, content))
+            elif any(ashlar in file_lower for ashlar in ['ashlar', 'mining', 'device']):
+                ashlar_files.append((file_path, content))
+            else:
+                general_files.append((file_path, content))
+        
+        all_files = critical_files + ashlar_files + general_files
+        file_sections = [f"=== {file_path} ===\n{content}\n\n" for file_path, content in all_files]
+        context_parts = self.budgeter.pack(
+            [(section, self.budgeter.estimate(section)) for section in file_sections], budget
+        )
+        
+        return "\n".join(context_parts)
+    
+    def chunk_tokens(self, index: RetrievalIndex, chunk_id: int) -> int:
+        chunk = index.chunks[chunk_id]
+        # Allow for the file header and heading line each chunk may bring along
+        return self.budgeter.estimate(f"=== {chunk['path']} ===\n[{chunk['heading']}]\n{chunk['text']}\n")
+    
+    def prepare_retrieved_context(self, index: RetrievalIndex, question: str, budget: int,
+                                  exclude: frozenset = frozenset()) -> str:
+        """Context built from the retrieved chunks that best fit the token budget, instead of whole files
+        
+        Chunks in exclude (already in the cached prompt prefix) are skipped.
+        """
+        results = [
+            (chunk_id, score) for chunk_id, score in index.search(question, RETRIEVAL_CANDIDATES)
+            if score > 0 and chunk_id not in exclude
+        ]
+        if results:
+            # Most relevance per token first
+            ranked = sorted(results, key=lambda item: item[1] / self.chunk_tokens(index, item[0]), reverse=True)
+            chunk_ids = self.budgeter.pack([(chunk_id, self.chunk_tokens(index, chunk_id)) for chunk_id, _ in ranked], budget)
+        else:
+            # Nothing matched; fall back to the opening chunks (README and friends)
+            candidates = [chunk_id for chunk_id in range(min(RETRIEVAL_CANDIDATES, len(index.chunks))) if chunk_id not in exclude]
+            chunk_ids = self.budgeter.pack([(chunk_id, self.chunk_tokens(index, chunk_id)) for chunk_id in candidates], budget)
+        
+        return self.format_chunks(index, chunk_ids)
+    
+    def prepare_stable_context(self, index: RetrievalIndex) -> tuple:
+        """(text, chunk ids) of the corpus's opening chunks, the same for every question against index
+        
+        They end in the prompt-cache breakpoint, so every question against one corpus version reads
+        them from the cache; retrieval fills the rest of the budget with other chunks.
+        """
+        cached_index, text, chunk_ids = self._stable_context
+        if cached_index is index:
+            return text, chunk_ids
+        
+        selected = []
+        used = 0
+        for chunk_id in range(len(index.chunks)):
+            tokens = self.chunk_tokens(index, chunk_id)
+            if used + tokens > CACHED_CONTEXT_TOKENS:
+                break
+            selected.append(chunk_id)
+            used += tokens
+        
+        text, chunk_ids = self.format_chunks(index, selected), frozenset(selected)
+        self._stable_context = (index, text, chunk_ids)
+        return text, chunk_ids
+    
+    def format_chunks(self, index: RetrievalIndex, chunk_ids: List[int]) -> str:
+        # Corpus order keeps each file's chunks together and the output deterministic
+        context_parts = []
+        current_path = None
+        for chunk_id in sorted(chunk_ids):
+            chunk = index.chunks[chunk_id]
+            if chunk['path'] != current_path:
+                current_path = chunk['path']
+                context_parts.append(f"=== {current_path} ===")
+            if chunk['heading']:
+                context_parts.append(f"[{chunk['heading']}]")
+            context_parts.append(f"{chunk['text']}\n")
+        
+        return "\n".join(context_parts)
+    
+    def prepare_conversation_messages(self, conversation_history: List[Dict]) -> List[Dict]:
+        """Exchanges as real user/assistant turns; ConversationMemory already picked which ones"""
+        messages = []
+        for exchange in conversation_history or []:
+            question, answer_text = exchange_texts(exchange)
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer_text})
+        
+        return messages
+    
+    def citation_scanner(self, index: CitationIndex = None) -> CitationScanner:
+        if index is None:
+            index = self.corpus.citations
+        if index is None:
+            index = self.corpus.build_citation_index(self.corpus.documents)
+        return index.scanner()
+    
+    def extract_citations(self, response_text: str, scanner: CitationScanner = None) -> tuple:
+        """Bold every mention of a corpus document and return the text with (path, GitHub URL) citations
+        
+        A scanner that already saw the answer stream in only has to scan whatever arrived after its
+        last update.
+        """
+        scanner = scanner or self.citation_scanner()
+        scanner.feed(response_text)
+        scanner.finish()
+        return scanner.formatted_text(), scanner.citations()
+    
+    def build_request(self, question: str, context: str, conversation_history: List[Dict] = None,
+                      summary: str = "", tier: Dict = None, stable_context: str = "") -> Dict:
+        """Messages API arguments laid out as a stable, cacheable prefix followed by the variable parts
+        
+        The instructions and stable_context (the same for every question against one corpus
+        version) come first and end in the only cache breakpoint. The documentation retrieved for
+        this question, the summary of older exchanges and the recent turns follow it; they differ
+        from one question to the next, so a breakpoint after them would never be read back.
+        """
+        messages = self.prepare_conversation_messages(conversation_history)
+        messages.append({"role": "user", "content": question})
+        
+        system = [{"type": "text", "text": ENTROPY_INSTRUCTIONS}]
+        if stable_context:
+            system.append({
+                "type": "text",
+                "text": f"Available Entropy Documentation:\n{stable_context}",
+                "cache_control": {"type": "ephemeral"}
+            })
+        if context:
+            heading = "More Entropy Documentation for this question" if stable_context else "Available Entropy Documentation"
+            system.append({"type": "text", "text": f"{heading}:\n{context}"})
+        if summary:
+            system.append({"type": "text", "text": f"Summary of the earlier conversation:\n{summary}"})
+        
+        tier = tier or MODEL_TIERS["large"]
+        return {
+            "model": tier["model"],
+            "max_tokens": tier["max_tokens"],
+            "system": system,
+            "messages": messages
+        }
+    
+    def summarize_conversation(self, summary: str, exchanges: List[Dict]) -> str:
+        """Fold exchanges that left the verbatim window into the running summary"""
+        transcript = "\n\n".join(
+            f"User: {question}\nAssistant: {answer_text}" for question, answer_text in map(exchange_texts, exchanges)
+        )
+        request = {
+            "model": SUMMARY_MODEL,
+            "max_tokens": SUMMARY_TOKEN_BUDGET,
+            "system": SUMMARY_INSTRUCTIONS,
+            "messages": [{
+                "role": "user",
+                "content": f"Current summary:\n{summary or '(none yet)'}\n\nNew exchanges:\n{transcript}"
+            }]
+        }
+        with self.metrics.span("summary"):
+            return self.generate_answer(request)
+    
+    def route_question(self, question: str, conversation_history: List[Dict] = None,
+                       index: RetrievalIndex = None) -> Route:
+        """Where a question goes: a direct reply, or the model tier that should answer it"""
+        if self.router is None:
+            return Route("large", "routing disabled")
+        route = self.router.route(question, conversation_history, index if index is not None else self.corpus.index)
+        self.metrics.inc("entropy_routes_total", tier=route.tier, reason=route.reason.split(" ", 1)[0])
+        self.metrics.annotate(route=route.tier)
+        return route
+    
+    def model_tier(self, route: Route) -> Dict:
+        return route.settings(self.router.tiers if self.router else MODEL_TIERS)
+    
+    def prepare_request(self, documents: Dict[str, str], question: str, conversation_history: List[Dict] = None,
+                        tier: Dict = None, index: RetrievalIndex = None) -> Optional[Dict]:
+        """Messages API arguments for a question against loaded documents, or None without any context
+        
+        Pass the index of the corpus state the documents came from; the live one may be newer.
+        """
+        tier = tier or MODEL_TIERS["large"]
+        if CALIBRATE_TOKEN_ESTIMATE and not self.budgeter.calibrated:
+            sample_text = "\n\n".join(list(documents.values())[:5])[:20000]
+            self.budgeter.calibrate(self.client, CLAUDE_MODEL, sample_text)
+        
+        summary, recent = self.memory.split(conversation_history)
+        history_texts = [message["content"] for message in self.prepare_conversation_messages(recent)]
+        if conversation_history:
+            self.metrics.observe(
+                "entropy_conversation_bytes", len(summary) + sum(map(len, history_texts)), buckets=BYTE_BUCKETS
+            )
+        
+        # Whatever the instructions, history, question and answer need comes off the top
+        budget = self.budgeter.documentation_budget(
+            [ENTROPY_INSTRUCTIONS, question, summary] + history_texts, tier["max_tokens"]
+        )
+        if tier.get("doc_tokens") is not None:
+            budget = min(budget, tier["doc_tokens"])
+        
+        if index is None:
+            index = self.corpus.index
+        stable_context, exclude = "", frozenset()
+        # The cached prefix only pays off when it leaves room for the chunks this question needs
+        if index and index.chunks and budget >= 2 * CACHED_CONTEXT_TOKENS:
+            stable_context, exclude = self.prepare_stable_context(index)
+            budget -= self.budgeter.estimate(stable_context)
+        context = self.prepare_entropy_context(documents, question, budget, index, exclude)
+        if not index or not index.chunks:
+            # Whole files packed without retrieval do not depend on the question, so all of it is cached
+            stable_context, context = context, ""
+        
+        if not stable_context and not context:
+            return None
+        
+        return self.build_request(question, context, recent, summary, tier, stable_context)
+    
+    def answer_cache_key(self, question: str, version: str = None) -> tuple:
+        return (normalize_question(question), version or self.corpus.version)
+    
+    def prewarm_answers(self, questions: List[str]):
+        """Answer questions in a background thread so their answers are cached for the current corpus"""
+        if not self.answer_cache or not self._prewarm_lock.acquire(blocking=False):
+            return
+        
+        def run():
+            try:
+                for question in questions:
+                    self.answer_entropy_question(question)
+            finally:
+                self._prewarm_lock.release()
+        
+        threading.Thread(target=run, name="answer-prewarm", daemon=True).start()
+    
+    def generate_answer(self, request: Dict, on_text: Callable[[str], None] = None) -> str:
+        """Run the request, streaming partial text to on_text as it arrives when given"""
+        input_tokens = self.budgeter.estimate_request(request)
+        if self.engine is not None:
+            key = AsyncAnswerEngine.request_key(request, self.corpus.version)
+            return self.engine.generate_blocking(request, key, on_text, input_tokens)
+        
+        for attempt in range(MAX_RETRIES + 1):
+            if self.limiter:
+                with self.metrics.span("queue"):
+                    self.limiter.acquire(input_tokens)
+            try:
+                return self.call_claude(request, on_text)
+            except Exception as e:
+                if attempt >= MAX_RETRIES or not is_retryable(e):
+                    raise
+                self.metrics.record_error(e, "llm_retry")
+                delay = retry_delay(attempt, e)
+                if self.limiter and is_rate_limit(e):
+                    self.limiter.pause(delay)
+                time.sleep(delay)
+    
+    def call_claude(self, request: Dict, on_text: Callable[[str], None] = None) -> str:
+        if on_text is None:
+            response = self.client.messages.create(**request)
+            self.metrics.record_usage(response.usage)
+            return response.content[0].text
+        
+        response_text = ""
+        last_update = 0.0
+        with self.client.messages.stream(**request) as stream:
+            for text in stream.text_stream:
+                response_text += text
+                # Throttle re-renders; every update is a websocket message to the browser
+                now = time.monotonic()
+                if now - last_update >= STREAM_UPDATE_INTERVAL:
+                    on_text(response_text)
+                    last_update = now
+            self.metrics.record_usage(stream.get_final_message().usage)
+        
+        on_text(response_text)
+        return response_text
+    
+    def answer_entropy_question(self, question: str, conversation_history: List[Dict] = None,
+                                on_text: Callable[[str], None] = None) -> str:
+        with self.metrics.trace(turn=len(conversation_history or []) + 1, streaming=on_text is not None):
+            answer = self._answer(question, conversation_history, on_text)
+        # Exchanges that age out with this turn are summarized after the answer, never before one
+        self.memory.fold_in_background(list(conversation_history or []) + [{"question": question, "answer": answer}])
+        return answer
+    
+    def _answer(self, question: str, conversation_history: List[Dict], on_text: Callable[[str], None]) -> Dict:
+        metrics = self.metrics
+        # One corpus state for the whole answer; a refresh may publish a new one meanwhile
+        state = self.corpus.state
+        if not self.is_cache_valid():
+            with self.events.busy("Loading Entropy documentation..."), metrics.span("fetch"):
+                self.load_documents()
+            state = self.corpus.state
+        documents = state.documents
+        if not documents:
+            metrics.inc("entropy_answers_total", outcome="no_docs")
+            return {"text": "Could not load Entropy documentation. Please try again later.", "citations": []}
+        
+        with metrics.span("route"):
+            route = self.route_question(question, conversation_history, state.index)
+        if route.reply is not None:
+            if on_text is not None:
+                on_text(route.reply)
+            metrics.inc("entropy_answers_total", outcome="direct")
+            return {"text": route.reply, "citations": []}
+        
+        # Only first-turn questions are shared between users; follow-ups depend on the conversation
+        cache_key = None
+        if self.answer_cache is not None and not conversation_history:
+            with metrics.span("cache_check"):
+                cache_key = self.answer_cache_key(question, state.version)
+                cached_answer = self.answer_cache.get(cache_key)
+            metrics.inc("entropy_answer_cache_total", result="hit" if cached_answer else "miss")
+            if cached_answer:
+                metrics.inc("entropy_answers_total", outcome="cached")
+                return cached_answer
+        
+        with metrics.span("context"):
+            tier = self.model_tier(route)
+            request = self.prepare_request(documents, question, conversation_history, tier, state.index)
+        metrics.annotate(model=tier["model"])
+        if request is None:
+            metrics.inc("entropy_answers_total", outcome="no_docs")
+            return {"text": "No Entropy documentation content available.", "citations": []}
+        
+        import anthropic  # Only needed for the error types below
+        
+        # Citations are matched as the answer streams, leaving only the tail for the end
+        scanner = self.citation_scanner(state.citations)
+        if on_text is not None:
+            show_text = on_text
+            
+            def on_text(partial_text: str):
+                scanner.feed(partial_text)
+                show_text(partial_text)
+        
+        try:
+            with metrics.span("llm"):
+                if on_text is None:
+                    with self.events.busy("Analyzing Entropy documentation..."):
+                        response_text = self.generate_answer(request)
+                else:
+                    response_text = self.generate_answer(request, on_text)
+            
+            with metrics.span("citations"):
+                formatted_text, citations = self.extract_citations(response_text, scanner)
+            
+            # Return both the formatted text and citations
+            answer = {"text": formatted_text, "citations": citations}
+            if cache_key:
+                self.answer_cache.put(cache_key, answer)
+            metrics.inc("entropy_answers_total", outcome="answered")
+            return answer
+            
+        except anthropic.AuthenticationError as e:
+            metrics.record_error(e, "llm")
+            metrics.inc("entropy_answers_total", outcome="error")
+            return {"text": "Invalid Claude API key. Please check the API key configuration.", "citations": []}
+        except anthropic.RateLimitError as e:
+            metrics.record_error(e, "llm")
+            metrics.inc("entropy_answers_total", outcome="error")
+            return {"text": "Rate limit exceeded. Please wait a moment and try again.", "citations": []}
+        except Exception as e:
+            metrics.record_error(e, "llm")
+            metrics.inc("entropy_answers_total", outcome="error")
+            return {"text": f"Error generating response: {str(e)}", "citations": []}
@@ -0,0 +1,138 @@
+"""Finding mentions of corpus documents in answers with one pass over the text"""
+import posixpath
+from collections import deque
+from typing import Dict, List, Tuple
+
+# Characters that continue a file name; a mention must not be glued to any of them
+NAME_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789_-/.")
+TRAILING_NAME_CHARS = NAME_CHARS - {"."}  # A full stop after a file name ends the sentence, not the name
+
+def _fold(char: str) -> str:
+    folded = char.lower()
+    return folded if len(folded) == 1 else char
+
+class CitationIndex:
+    """Aho–Corasick automaton over every document's full path and basename
+    
+    Built once per corpus version from {path: URL}. An ambiguous basename resolves to the first
+    file in corpus order, which puts READMEs and getting-started guides ahead of deeper pages.
+    """
+    
+    def __init__(self, links: Dict[str, str]):
+        self.links = links
+        self.targets = {}
+        for file_path in links:
+            for pattern in (file_path.lower(), posixpath.basename(file_path).lower()):
+                self.targets.setdefault(pattern, file_path)
+        
+        # goto[state] maps a character to the next state; outputs[state] lists (length, path)
+        self._goto = [{}]
+        self._outputs = [[]]
+        for pattern, file_path in self.targets.items():
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append((len(pattern), file_path))
+        
+        # Failure links, breadth first so every shorter suffix is linked before it is needed
+        self._fail = [0] * len(self._goto)
+        queue = deque([0])
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                if state:
+                    fallback = self._fail[state]
+                    while fallback and char not in self._goto[fallback]:
+                        fallback = self._fail[fallback]
+                    self._fail[next_state] = self._goto[fallback].get(char, 0)
+                    self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+                queue.append(next_state)
+    
+    def url(self, file_path: str) -> str:
+        return self.links[file_path]
+    
+    def step(self, state: int, char: str) -> int:
+        while state and char not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(char, 0)
+    
+    def scanner(self) -> 'CitationScanner':
+        return CitationScanner(self)
+
+class CitationScanner:
+    """Incremental matcher for one answer
+    
+    feed() takes the answer so far, as a streaming callback receives it, and only scans the
+    characters it has not seen yet. A mention ending at the last character is held back until the
+    next character (or finish()) shows whether the name really ends there.
+    """
+    
+    def __init__(self, index: CitationIndex):
+        self.index = index
+        self.text = ""
+        self._state = 0
+        self._matches = []  # (start, end, file_path) with both boundaries checked
+        self._pending = []  # Same, still waiting for the character after end
+    
+    def feed(self, text: str):
+        if not text.startswith(self.text):
+            # The answer restarted (a retried stream); scan it afresh
+            self.__init__(self.index)
+        index = self.index
+        position = len(self.text)
+        self.text = text
+        for offset in range(position, len(text)):
+            char = _fold(text[offset])
+            if self._pending:
+                if char not in TRAILING_NAME_CHARS:
+                    self._matches.extend(self._pending)
+                self._pending = []
+            
+            self._state = index.step(self._state, char)
+            for length, file_path in index._outputs[self._state]:
+                start = offset + 1 - length
+                if start == 0 or _fold(text[start - 1]) not in NAME_CHARS:
+                    self._pending.append((start, offset + 1, file_path))
+    
+    def finish(self) -> 'CitationScanner':
+        self._matches.extend(self._pending)
+        self._pending = []
+        return self
+    
+    def mentions(self) -> List[Tuple[int, int, str]]:
+        """Non-overlapping mentions found so far, preferring the longest at each position"""
+        mentions = []
+        covered_until = 0
+        for start, end, file_path in sorted(self._matches, key=lambda match: (match[0], -match[1])):
+            if start >= covered_until:
+                mentions.append((start, end, file_path))
+                covered_until = end
+        return mentions
+    
+    def citations(self) -> List[Tuple[str, str]]:
+        """(file path, GitHub URL) for each cited document, in order of first mention"""
+        seen = {}
+        for _, _, file_path in self.mentions():
+            if file_path not in seen:
+                seen[file_path] = self.index.url(file_path)
+        return list(seen.items())
+    
+    def formatted_text(self) -> str:
+        """The answer with each mention in bold, unless it is already emphasised or in code"""
+        text = self.text
+        parts = []
+        last = 0
+        for start, end, _ in self.mentions():
+            if start and text[start - 1] in "*`":
+                continue
+            parts.append(text[last:start])
+            parts.append(f"**{text[start:end]}**")
+            last = end
+        parts.append(text[last:])
+        return "".join(parts)
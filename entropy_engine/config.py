@@ -0,0 +1,87 @@
+"""Engine settings"""
+import os
+from datetime import timedelta
+
+CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+MAX_ANSWER_TOKENS = 2500
+# Model tiers picked by the query router; "large" serves anything the router is unsure about
+MODEL_TIERS = {
+    "small": {"model": "claude-3-5-haiku-20241022", "max_tokens": 800, "doc_tokens": 3000},
+    "large": {"model": CLAUDE_MODEL, "max_tokens": MAX_ANSWER_TOKENS, "doc_tokens": None},
+}
+ROUTE_QUERIES = True  # False sends every question to the large tier
+ROUTE_SIMPLE_MAX_TERMS = 8  # Longer questions always go to the large tier
+ROUTE_COMPLEX_SCORE = 0.75
+CONVERSATION_TURNS = 3  # Most recent exchanges sent verbatim; older ones are summarized
+HISTORY_TOKEN_BUDGET = 4000  # Verbatim turns plus the summary of older ones
+SUMMARY_TOKEN_BUDGET = 400
+SUMMARY_MODEL = "claude-3-5-haiku-20241022"
+SUMMARIZE_WITH_CLAUDE = True  # False keeps an extractive summary and makes no extra calls
+CONTEXT_WINDOW_TOKENS = 200000
+DOC_TOKEN_BUDGET = 8000  # Upper bound on documentation tokens per question; None fills the window
+CACHED_CONTEXT_TOKENS = 3000  # Opening chunks (README and friends) sent to every question as the cached prompt prefix
+CONTEXT_SAFETY_MARGIN = 0.05  # Fraction of the window kept free to absorb estimation error
+DEFAULT_CHARS_PER_TOKEN = 3.5
+CALIBRATE_TOKEN_ESTIMATE = False
+RATE_LIMIT_RPM = 50
+RATE_LIMIT_INPUT_TPM = 40000
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+STREAM_UPDATE_INTERVAL = 0.05  # Seconds between re-renders of a streaming answer
+ANSWER_CACHE_SIZE = 512
+ANSWER_CACHE_TTL = timedelta(hours=1)
+METRICS_PORT = int(os.environ.get("ENTROPY_METRICS_PORT", 0)) or None  # Serves /metrics and /metrics.json when set
+METRICS_LOG_JSON = os.environ.get("ENTROPY_METRICS_LOG", "").lower() in ("1", "true", "yes")
+BATCH_WORKERS = 4  # Concurrent Claude requests in batch mode; the rate limiter still paces them
+
+POPULAR_QUESTIONS = [
+    "How do I set up my Ashlar mining device?",
+    "What is the Entropy project and how does it work?",
+    "How do I earn $ENT tokens through mining?",
+    "What are the community rules I need to follow?",
+    "How much can I earn mining entropy?",
+    "What is the Jeeter Deleter rule?",
+    "How do I connect my Ashlar to the network?",
+    "What makes Entropy different from other crypto projects?"
+]
+
+REPO_OWNER = "justentropy-lol"
+REPO_NAME = "entropy-docs"
+# Documentation sources, each fetched, refreshed, snapshotted and indexed as its own shard. Only
+# "name", "owner" and "repo" are required; the rest default as in entropy_engine.sources.Source:
+#   "branch"     pinned branch (default: main, falling back to master)
+#   "include"    glob patterns a path must match, "exclude" patterns it must not
+#   "extensions" documentation file extensions (default: DOC_EXTENSIONS)
+#   "ttl_minutes", "scheduled"  refresh policy: expiry, and whether to refresh ahead of it
+#   "prefix"     prepended to the source's paths in prompts and citations (default: "" for the
+#                first source, "<name>/" for the others)
+SOURCES = [
+    {"name": "docs", "owner": REPO_OWNER, "repo": REPO_NAME},
+]
+SOURCES_FILE = os.environ.get("ENTROPY_SOURCES")  # JSON file with a list like SOURCES, used instead when set
+GITHUB_API_URL = os.environ.get("ENTROPY_GITHUB_API_URL", "https://api.github.com")
+FETCH_CONCURRENCY = 8
+REQUEST_TIMEOUT = 30
+INGEST_MODE = "archive"
+DOC_EXTENSIONS = ['.md', '.txt', '.rst', '.mdx']
+PRIORITY_KEYWORDS = ['readme', 'getting-started', 'quickstart', 'installation', 'ashlar', 'mining', 'entropy', 'faq']
+MAX_FILE_SIZE = 500000
+CORPUS_TTL = timedelta(hours=2)
+REFRESH_AHEAD = timedelta(minutes=15)  # The background scheduler refreshes this long before the corpus expires
+REFRESH_RETRY_BASE_DELAY = 30.0  # Seconds; doubles after each failed refresh
+REFRESH_RETRY_MAX_DELAY = 1800.0
+WEBHOOK_PORT = int(os.environ.get("ENTROPY_WEBHOOK_PORT", 0)) or None  # Serves the GitHub push webhook when set
+WEBHOOK_SECRET = os.environ.get("ENTROPY_WEBHOOK_SECRET", "")
+WEBHOOK_MAX_COMMITS = 20  # GitHub lists at most this many commits; a push this size may be truncated
+NORMALIZE_DOCUMENTS = True  # Strip front-matter, MDX/HTML markup, images and repeated boilerplate at ingestion
+BOILERPLATE_MIN_FILES = 3
+BOILERPLATE_MIN_SHARE = 0.3  # A paragraph repeated in this share of files is navigation, not content
+SNAPSHOT_DIR = os.environ.get("ENTROPY_SNAPSHOT_DIR", ".entropy_cache")
+CHUNK_CHARS = 1500
+RETRIEVAL_TOP_K = 12
+RETRIEVAL_CANDIDATES = 48  # Chunks scored per question before packing them into the token budget
+RETRIEVAL_MODE = "hybrid"  # "lexical", "dense" or "hybrid"
+HYBRID_ALPHA = 0.5  # Weight of the dense score in hybrid mode
+DENSE_DIM = 256
+DENSE_NGRAM = 3
@@ -0,0 +1,400 @@
+"""The shared documentation corpus and its refresh cycle"""
+import hashlib
+import logging
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from .citations import CitationIndex
+from .config import (
+    CORPUS_TTL, DEFAULT_CHARS_PER_TOKEN, DENSE_DIM, DOC_EXTENSIONS, FETCH_CONCURRENCY, INGEST_MODE,
+    NORMALIZE_DOCUMENTS, PRIORITY_KEYWORDS, REFRESH_AHEAD, REFRESH_RETRY_BASE_DELAY, REFRESH_RETRY_MAX_DELAY
+)
+from .events import EngineEvents
+from .normalize import find_boilerplate, normalize_document, remove_boilerplate
+from .retrieval import DenseIndex, RetrievalIndex, chunk_document
+from .snapshot import SnapshotStore
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger("entropy_engine")
+
+def is_doc_file(file_path: str) -> bool:
+    return any(file_path.endswith(ext) for ext in DOC_EXTENSIONS)
+
+def order_doc_files(file_paths: List[str], is_doc: Callable[[str], bool] = is_doc_file) -> List[str]:
+    """Filter to documentation files, moving priority files to the front"""
+    doc_files = []
+    for file_path in file_paths:
+        if is_doc(file_path):
+            if any(important in file_path.lower() for important in PRIORITY_KEYWORDS):
+                doc_files.insert(0, file_path)
+            else:
+                doc_files.append(file_path)
+    return doc_files
+
+def create_http_session(pool_size: int) -> 'requests.Session':
+    """Keep-alive session whose connection pool fits one connection per fetch worker"""
+    import requests
+    
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def corpus_version(documents: Dict[str, str], blob_shas: Dict[str, str], boilerplate: Iterable[str] = ()) -> str:
+    """Short content hash of the corpus; changes whenever any file is added, removed or edited
+    
+    Documents are normalized against the boilerplate set, so a change to it is a new version too.
+    """
+    digest = hashlib.sha1()
+    for paragraph in sorted(boilerplate):
+        digest.update(f"\0{paragraph}\n".encode('utf-8'))
+    for file_path in sorted(documents):
+        sha = blob_shas.get(file_path) or hashlib.sha1(documents[file_path].encode('utf-8')).hexdigest()
+        digest.update(f"{file_path}\0{sha}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def content_key(content: str) -> str:
+    """Key for anything derived from a document's text alone (snapshot blobs, chunk lists)"""
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+def refresh_backoff(failures: int) -> float:
+    """Seconds to wait after the given number of consecutive failed refreshes, jittered"""
+    delay = min(REFRESH_RETRY_MAX_DELAY, REFRESH_RETRY_BASE_DELAY * 2 ** (failures - 1))
+    return random.uniform(delay / 2, delay)
+
+class CorpusState(NamedTuple):
+    """One published version of the corpus; replaced as a whole, never modified"""
+    documents: Dict[str, str]
+    index: Optional[RetrievalIndex]
+    citations: Optional[CitationIndex]
+    version: Optional[str]
+    timestamp: Optional[datetime]
+
+EMPTY_STATE = CorpusState({}, None, None, None, None)
+
+class DocsCorpus:
+    """Documentation corpus shared by every session in the process
+    
+    Readers see one CorpusState at a time: a refresh builds the next one on the side and
+    publishes it with a single assignment, so the documents, index, citations and version a
+    reader gets always belong together.
+    """
+    
+    def __init__(self, repo_owner: str, repo_name: str, cache_duration: timedelta = CORPUS_TTL,
+                 fetch_concurrency: int = FETCH_CONCURRENCY, ingest_mode: str = INGEST_MODE,
+                 store: SnapshotStore = None, branch: str = None, is_doc: Callable[[str], bool] = is_doc_file,
+                 prefix: str = ""):
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.ingest_mode = ingest_mode
+        # A pinned branch is the only one fetched; otherwise main, falling back to master
+        self.pinned_branch = branch
+        self.is_doc = is_doc
+        # Prepended to file paths in the index and citations, to tell sources apart
+        self.prefix = prefix
+        self.state = EMPTY_STATE
+        self.cache_duration = cache_duration
+        # Git metadata for the documents we hold, used to refresh incrementally
+        self.branch = branch
+        self.tree_sha = None
+        self.tree_etag = None
+        self.blob_shas = {}
+        self.boilerplate = set()
+        self.index_key = None  # Digest of the indexed paths and texts, keying the snapshotted dense matrix
+        self.normalization = {}
+        self._listeners = []
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.http = create_http_session(self.fetch_concurrency)
+        self._refresh_lock = threading.Lock()
+        # Consecutive failed refreshes, and when (time.monotonic()) another may be attempted
+        self.refresh_failures = 0
+        self._retry_at = 0.0
+        self._scheduler = None
+        self._stop = threading.Event()
+        self.store = store
+        if store:
+            self.load_snapshot()
+    
+    @property
+    def documents(self) -> Dict[str, str]:
+        return self.state.documents
+    
+    @property
+    def index(self) -> Optional[RetrievalIndex]:
+        return self.state.index
+    
+    @property
+    def citations(self) -> Optional[CitationIndex]:
+        return self.state.citations
+    
+    @property
+    def version(self) -> Optional[str]:
+        return self.state.version
+    
+    @property
+    def timestamp(self) -> Optional[datetime]:
+        return self.state.timestamp
+    
+    def is_valid(self) -> bool:
+        state = self.state
+        if not state.timestamp or not state.documents:
+            return False
+        return datetime.now() - state.timestamp < self.cache_duration
+    
+    def set_tree(self, branch: str, tree_sha: str, tree_etag: str, blob_shas: Dict[str, str]):
+        self.branch = branch
+        self.tree_sha = tree_sha
+        self.tree_etag = tree_etag
+        self.blob_shas = blob_shas
+    
+    @property
+    def repo(self) -> str:
+        return f"{self.repo_owner}/{self.repo_name}"
+    
+    def load_snapshot(self) -> bool:
+        snapshot = self.store.load(self.repo)
+        if not snapshot or not snapshot['documents']:
+            return False
+        
+        documents = snapshot['documents']
+        self.set_tree(snapshot['branch'], snapshot['tree_sha'], snapshot['tree_etag'],
+                      {file_path: sha for file_path, sha, _ in snapshot['files'] if sha})
+        self.boilerplate = set(snapshot.get('boilerplate', []))
+        # Usable immediately; with no timestamp it is still checked against GitHub on first use
+        self.state = CorpusState(
+            documents, self.build_index(documents), self.build_citation_index(documents),
+            corpus_version(documents, self.blob_shas, self.boilerplate), None
+        )
+        return True
+    
+    def normalize_documents(self, documents: Dict[str, str]) -> Dict[str, str]:
+        """Clean text for every new or changed document, plus corpus-wide boilerplate removal
+        
+        Files the fetcher carried over unchanged come back as the very strings normalized last
+        time, so only downloads pay for normalization.
+        """
+        previous = self.documents
+        normalized = {}
+        raw_chars = changed = 0
+        for file_path, content in documents.items():
+            if previous.get(file_path) is content:
+                normalized[file_path] = content
+                continue
+            clean = normalize_document(content)
+            raw_chars += len(content)
+            changed += 1
+            normalized[file_path] = clean
+        
+        self.boilerplate |= find_boilerplate(normalized)
+        normalized = remove_boilerplate(normalized, self.boilerplate)
+        
+        if changed:
+            raw_tokens = int(raw_chars / DEFAULT_CHARS_PER_TOKEN)
+            clean_chars = sum(len(normalized[path]) for path in documents if previous.get(path) is not documents[path])
+            clean_tokens = int(clean_chars / DEFAULT_CHARS_PER_TOKEN)
+            self.normalization = {"files": changed, "raw_tokens": raw_tokens, "clean_tokens": clean_tokens}
+            logger.info("Normalized %d files: ~%d -> ~%d tokens (%.0f%% smaller)", changed, raw_tokens, clean_tokens,
+                        100 * (1 - clean_tokens / raw_tokens) if raw_tokens else 0)
+        return normalized
+    
+    def footprint(self) -> Dict[str, int]:
+        """Approximate memory held by the documents and the retrieval index, in bytes"""
+        documents, index = self.documents, self.index
+        footprint = {
+            "files": len(documents),
+            "document_bytes": sum(sys.getsizeof(path) + sys.getsizeof(content) for path, content in documents.items()),
+            "chunks": 0,
+            "chunk_bytes": 0,
+            "dense_bytes": 0,
+        }
+        if index:
+            footprint["chunks"] = len(index.chunks)
+            footprint["chunk_bytes"] = sum(sys.getsizeof(chunk['text']) for chunk in index.chunks)
+            if index.dense:
+                # Arrays loaded from the snapshot are memory-mapped, so this is address space, not RSS
+                footprint["dense_bytes"] = index.dense.matrix.nbytes + index.dense.idf.nbytes
+        return footprint
+    
+    def build_index(self, documents: Dict[str, str]) -> RetrievalIndex:
+        chunks = []
+        index_digest = hashlib.sha1()
+        for file_path, content in documents.items():
+            # Chunk lists depend only on the normalized text, so the snapshot keeps them per text hash
+            key = content_key(content)
+            index_digest.update(f"{self.prefix}{file_path}\0{key}\n".encode('utf-8'))
+            file_chunks = self.store.load_derived("chunks", key) if self.store else None
+            if file_chunks is None:
+                file_chunks = chunk_document(content)
+                if self.store:
+                    self.store.save_derived("chunks", key, file_chunks)
+            chunks.extend({"path": self.prefix + file_path, **chunk} for chunk in file_chunks)
+        
+        self.index_key = index_digest.hexdigest()
+        return RetrievalIndex(chunks, self.build_dense_index(chunks, self.index_key))
+    
+    def citation_links(self, documents: Dict[str, str]) -> Dict[str, str]:
+        """GitHub URL of every document, keyed by its path as prompts and answers show it"""
+        # Links follow the branch the documents came from, so nested paths and master-only repos resolve
+        url_base = f"https://github.com/{self.repo_owner}/{self.repo_name}/blob/{self.branch or 'main'}/"
+        return {self.prefix + file_path: url_base + file_path for file_path in documents}
+    
+    def build_citation_index(self, documents: Dict[str, str]) -> CitationIndex:
+        return CitationIndex(self.citation_links(documents))
+    
+    def build_dense_index(self, chunks: List[Dict], key: str = None) -> DenseIndex:
+        # The matrix depends on every chunk (through the IDF weights), so it is keyed by the
+        # paths and texts of the whole corpus
+        if self.store and key:
+            matrix = self.store.load_array("dense-matrix", key)
+            idf = self.store.load_array("dense-idf", key)
+            if matrix is not None and idf is not None and matrix.shape == (len(chunks), DENSE_DIM):
+                return DenseIndex(matrix, idf.copy())
+        
+        dense = DenseIndex.build([f"{chunk['path']} {chunk['heading']} {chunk['text']}" for chunk in chunks])
+        if self.store and key:
+            self.store.save_array("dense-matrix", key, dense.matrix)
+            self.store.save_array("dense-idf", key, dense.idf)
+        return dense
+    
+    def add_listener(self, callback: Callable[['DocsCorpus'], None]):
+        """Call callback(corpus) after every refresh that changes the corpus version"""
+        self._listeners.append(callback)
+    
+    def get_documents(self, fetch: Callable[[EngineEvents], Dict[str, str]],
+                      events: EngineEvents = None) -> Dict[str, str]:
+        """Return the corpus, refreshing it when it has expired
+        
+        An expired corpus is served as is while a background refresh fetches the next version
+        (stale-while-revalidate); only a process that has no documents at all waits for the
+        fetch, and not while backing off after a failed one. fetch(events) downloads the
+        documents; events only receives progress from a refresh that runs on the caller's thread.
+        """
+        documents = self.documents
+        if self.is_valid():
+            return documents
+        
+        if documents:
+            self.refresh_in_background(fetch)
+            return documents
+        if time.monotonic() < self._retry_at:
+            return documents  # Backing off; an unreachable repository must not stall every question
+        
+        with self._refresh_lock:
+            # Another session may have finished (or failed) the refresh while we were waiting
+            if not self.documents and time.monotonic() >= self._retry_at:
+                self._try_refresh(fetch, events or EngineEvents())
+        
+        # On a failed refresh keep serving the previous corpus, if any
+        return self.documents
+    
+    def refresh_in_background(self, fetch: Callable[[EngineEvents], Dict[str, str]]):
+        if time.monotonic() < self._retry_at:
+            return  # Backing off after a failed refresh
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # A refresh is already running
+        
+        def run():
+            try:
+                # Nobody is watching a background refresh, so progress only goes to the log
+                self._try_refresh(fetch, EngineEvents())
+            finally:
+                self._refresh_lock.release()
+        
+        threading.Thread(target=run, name="corpus-refresh", daemon=True).start()
+    
+    def refresh_now(self, fetch: Callable[[EngineEvents], Dict[str, str]], events: EngineEvents = None) -> bool:
+        """Refresh on this thread, after any refresh already running; False when it failed"""
+        with self._refresh_lock:
+            return self._try_refresh(fetch, events or EngineEvents())
+    
+    def start_scheduler(self, fetch: Callable[[EngineEvents], Dict[str, str]],
+                        refresh_ahead: timedelta = REFRESH_AHEAD) -> threading.Thread:
+        """Refresh from a daemon thread shortly before the corpus expires, so requests never wait on it
+        
+        Failed refreshes are retried with jittered exponential backoff; the corpus already
+        published keeps being served meanwhile. Calling this again returns the running thread.
+        """
+        if self._scheduler is not None and self._scheduler.is_alive():
+            return self._scheduler
+        
+        def run():
+            while not self._stop.wait(self.seconds_until_refresh(refresh_ahead)):
+                with self._refresh_lock:
+                    # A request-triggered refresh may have just run
+                    if self.seconds_until_refresh(refresh_ahead) <= 0:
+                        self._try_refresh(fetch, EngineEvents())
+        
+        self._stop.clear()
+        self._scheduler = threading.Thread(target=run, name="corpus-scheduler", daemon=True)
+        self._scheduler.start()
+        return self._scheduler
+    
+    def stop_scheduler(self):
+        self._stop.set()
+    
+    def seconds_until_refresh(self, refresh_ahead: timedelta = REFRESH_AHEAD) -> float:
+        backoff = self._retry_at - time.monotonic()
+        if backoff > 0:
+            return backoff
+        timestamp = self.timestamp
+        if not timestamp or not self.documents:
+            return 0.0
+        due = timestamp + self.cache_duration - min(refresh_ahead, self.cache_duration / 2)
+        return max(0.0, (due - datetime.now()).total_seconds())
+    
+    def _try_refresh(self, fetch: Callable[[EngineEvents], Dict[str, str]], events: EngineEvents) -> bool:
+        """Refresh under the caller's lock, tracking consecutive failures for backoff"""
+        try:
+            refreshed = self._refresh(fetch, events)
+        except Exception as e:
+            logger.warning("Corpus refresh failed: %s", e)
+            refreshed = False
+        
+        if refreshed:
+            self.refresh_failures = 0
+            self._retry_at = 0.0
+        else:
+            self.refresh_failures += 1
+            delay = refresh_backoff(self.refresh_failures)
+            self._retry_at = time.monotonic() + delay
+            logger.warning("Corpus refresh failed %d time(s) in a row; serving version %s, retrying in %.0fs",
+                           self.refresh_failures, self.version, delay)
+        return refreshed
+    
+    def _refresh(self, fetch: Callable[[EngineEvents], Dict[str, str]], events: EngineEvents) -> bool:
+        previous = self.state
+        documents = fetch(events)
+        if not documents:
+            return False
+        
+        if documents is not previous.documents or previous.index is None:
+            if NORMALIZE_DOCUMENTS:
+                documents = self.normalize_documents(documents)
+            index = self.build_index(documents)
+            citations = self.build_citation_index(documents)
+        else:
+            index, citations = previous.index, previous.citations
+        # Everything is built; publish it in one step
+        self.state = CorpusState(documents, index, citations, corpus_version(documents, self.blob_shas, self.boilerplate), datetime.now())
+        
+        if self.store:
+            try:
+                self.store.save(self.repo, self.branch, self.tree_sha, self.tree_etag, documents, self.blob_shas,
+                                self.boilerplate, [self.index_key])
+            except OSError:
+                pass  # The snapshot is an optimisation; never fail a refresh over it
+        
+        if self.version != previous.version:
+            for callback in self._listeners:
+                try:
+                    callback(self)
+                except Exception as e:
+                    logger.warning("Corpus listener failed: %s", e)
+        return True
@@ -0,0 +1,29 @@
+"""How the engine reports progress and problems without depending on a UI"""
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger("entropy_engine")
+
+class EngineEvents:
+    """Receives progress and problems from the engine
+
+    The default implementation only logs, which suits workers, CLIs and benchmarks; a UI
+    subclasses it to draw spinners and progress bars instead.
+    """
+
+    def error(self, message: str):
+        logger.error(message)
+    
+    def warning(self, message: str):
+        logger.warning(message)
+    
+    def progress(self, fraction: float, message: str = ""):
+        logger.debug("%3.0f%% %s", fraction * 100, message)
+    
+    def progress_done(self):
+        pass
+    
+    @contextmanager
+    def busy(self, message: str):
+        logger.info(message)
+        yield
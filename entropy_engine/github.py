@@ -0,0 +1,209 @@
+"""Fetching documentation from the GitHub API"""
+import base64
+import tarfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+from .config import GITHUB_API_URL, MAX_FILE_SIZE, REQUEST_TIMEOUT
+from .corpus import DocsCorpus, order_doc_files
+from .events import EngineEvents
+
+class DocsFetcher:
+    """Downloads a corpus' repository, incrementally when the corpus already holds a version of it"""
+    
+    def __init__(self, corpus: DocsCorpus, api_url: str = GITHUB_API_URL):
+        self.corpus = corpus
+        self.api_url = api_url.rstrip('/')
+        self.repo_owner = corpus.repo_owner
+        self.repo_name = corpus.repo_name
+        self.http = corpus.http
+    
+    @property
+    def base_url(self) -> str:
+        return f"{self.api_url}/repos/{self.repo_owner}/{self.repo_name}"
+    
+    def fetch_repo_tree(self) -> tuple:
+        """Return (branch, tree_data, etag); tree_data is None when the tree is unchanged (304)"""
+        branches = [self.corpus.pinned_branch] if self.corpus.pinned_branch else ['main', 'master']
+        if self.corpus.branch in branches:
+            branches.remove(self.corpus.branch)
+            branches.insert(0, self.corpus.branch)
+        
+        for branch in branches:
+            headers = {}
+            if branch == self.corpus.branch and self.corpus.tree_etag and self.corpus.documents:
+                headers['If-None-Match'] = self.corpus.tree_etag
+            
+            tree_url = f"{self.base_url}/git/trees/{branch}?recursive=1"
+            response = self.http.get(tree_url, headers=headers, timeout=REQUEST_TIMEOUT)
+            
+            if response.status_code == 304:
+                return branch, None, self.corpus.tree_etag
+            if response.status_code == 200:
+                return branch, response.json(), response.headers.get('ETag')
+        
+        return None, None, None
+    
+    def fetch_entropy_docs(self, events: EngineEvents = None) -> Dict[str, str]:
+        events = events or EngineEvents()
+        try:
+            branch, tree_data, etag = self.fetch_repo_tree()
+            if branch is None:
+                events.error("Could not access Entropy documentation repository.")
+                return {}
+            
+            if tree_data is None:
+                # Not modified since the last refresh; the corpus we hold is current
+                return self.corpus.documents
+            
+            blobs = {
+                item['path']: item for item in tree_data.get('tree', [])
+                if item['type'] == 'blob' and item.get('size', 0) <= MAX_FILE_SIZE
+            }
+            doc_files = order_doc_files(list(blobs), self.corpus.is_doc)
+            
+            if not doc_files:
+                events.warning("No documentation files found in the Entropy docs repository.")
+                return {}
+            
+            # Only files that are new or whose blob SHA moved need downloading;
+            # files missing from the new tree are dropped below
+            previous = self.corpus.documents
+            previous_shas = self.corpus.blob_shas
+            changed = [
+                file_path for file_path in doc_files
+                if file_path not in previous or previous_shas.get(file_path) != blobs[file_path].get('sha')
+            ]
+            
+            contents = {}
+            if not previous and self.corpus.ingest_mode == "archive":
+                with events.busy(f"Downloading {self.repo_name}@{branch} archive..."):
+                    contents = self.fetch_archive_docs(branch)
+                # Fall back to per-file downloads when the archive is unavailable
+            
+            if not contents and changed:
+                contents = self.fetch_files(changed, events, branch)
+            
+            documents = {}
+            blob_shas = {}
+            for file_path in doc_files:
+                if contents.get(file_path):
+                    documents[file_path] = contents[file_path]
+                    blob_shas[file_path] = blobs[file_path].get('sha')
+                elif file_path in previous and contents.get(file_path) is None:
+                    # Download failed; keep the old version so the next refresh retries it
+                    documents[file_path] = previous[file_path]
+                    blob_shas[file_path] = previous_shas.get(file_path)
+            
+            # Only remember the ETag when every changed file arrived, otherwise a 304
+            # would stop failed downloads from ever being retried
+            failed = [file_path for file_path in changed if contents.get(file_path) is None]
+            if documents:
+                self.corpus.set_tree(branch, tree_data.get('sha'), None if failed else etag, blob_shas)
+            
+            return documents
+            
+        except Exception as e:
+            events.error(f"Error fetching Entropy documentation: {e}")
+            return {}
+    
+    def fetch_changed_docs(self, changed: List[str], removed: List[str], events: EngineEvents = None) -> Dict[str, str]:
+        """The corpus with the changed files downloaded again and the removed ones dropped
+        
+        For pushes that list their files, so the tree is not fetched. The blob SHAs of the
+        downloaded files are unknown, which makes the next full refresh download them once more.
+        """
+        events = events or EngineEvents()
+        previous = self.corpus.documents
+        previous_shas = self.corpus.blob_shas
+        removed = set(removed)
+        changed = [file_path for file_path in order_doc_files(changed, self.corpus.is_doc) if file_path not in removed]
+        contents = self.fetch_files(changed, events, self.corpus.branch) if changed else {}
+        
+        documents = {file_path: content for file_path, content in previous.items() if file_path not in removed}
+        blob_shas = {file_path: previous_shas.get(file_path) for file_path in documents}
+        for file_path in changed:
+            if contents.get(file_path):
+                documents[file_path] = contents[file_path]
+            if file_path in documents:
+                # A failed download keeps the old text, but with no SHA so the next refresh retries it
+                blob_shas[file_path] = None
+        
+        # The tree SHA and ETag no longer describe these documents
+        self.corpus.set_tree(self.corpus.branch, None, None, blob_shas)
+        return documents
+    
+    def fetch_files(self, file_paths: List[str], events: EngineEvents = None, ref: str = None) -> Dict[str, str]:
+        events = events or EngineEvents()
+        
+        # Files are downloaded by a bounded pool of workers sharing one keep-alive
+        # session; progress is reported from this thread as downloads complete
+        contents = {}
+        with ThreadPoolExecutor(max_workers=self.corpus.fetch_concurrency) as executor:
+            futures = {executor.submit(self.fetch_file_content, file_path, ref): file_path for file_path in file_paths}
+            for i, future in enumerate(as_completed(futures)):
+                file_path = futures[future]
+                contents[file_path] = future.result()
+                events.progress((i + 1) / len(file_paths), f"Loaded {file_path}")
+        
+        events.progress_done()
+        
+        return contents
+    
+    def fetch_archive_docs(self, branch: str) -> Dict[str, str]:
+        """Download the branch tarball in one request and read documentation files from the stream"""
+        import requests  # Only for its exception type; the session comes from create_http_session
+        
+        url = f"{self.base_url}/tarball/{branch}"
+        documents = {}
+        
+        try:
+            with self.http.get(url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+                if response.status_code != 200:
+                    return {}
+                
+                # Members are read in order straight off the gzip stream; nothing is written to disk
+                with tarfile.open(fileobj=response.raw, mode="r|gz") as archive:
+                    for member in archive:
+                        if not member.isfile():
+                            continue
+                        
+                        # Entries are prefixed with an "<owner>-<repo>-<sha>/" directory
+                        file_path = member.name.split('/', 1)[-1]
+                        if not self.corpus.is_doc(file_path) or member.size > MAX_FILE_SIZE:
+                            continue
+                        
+                        try:
+                            content = archive.extractfile(member).read().decode('utf-8')
+                        except UnicodeDecodeError:
+                            continue
+                        
+                        if content:
+                            documents[file_path] = content
+        
+        except (requests.RequestException, tarfile.TarError):
+            return {}
+        
+        return documents
+    
+    def fetch_file_content(self, file_path: str, ref: str = None) -> str:
+        url = f"{self.base_url}/contents/{file_path}"
+        params = {'ref': ref} if ref else None
+        
+        try:
+            response = self.http.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 200:
+                content_data = response.json()
+                
+                size = content_data.get('size', 0)
+                if size > MAX_FILE_SIZE:
+                    return None
+                
+                if content_data.get('encoding') == 'base64':
+                    content = base64.b64decode(content_data['content']).decode('utf-8')
+                    return content
+                    
+        except Exception:
+            pass
+        
+        return None
@@ -0,0 +1,276 @@
+"""Token budgeting, rate limiting, retries and the shared async engine for Claude calls"""
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import queue
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List
+
+from .config import (
+    CONTEXT_SAFETY_MARGIN, CONTEXT_WINDOW_TOKENS, DEFAULT_CHARS_PER_TOKEN, DOC_TOKEN_BUDGET, MAX_RETRIES,
+    RATE_LIMIT_INPUT_TPM, RATE_LIMIT_RPM, RETRY_BASE_DELAY, RETRY_MAX_DELAY, STREAM_UPDATE_INTERVAL
+)
+from .metrics import Metrics
+
+if TYPE_CHECKING:
+    # The SDK takes over a second to import; callers that never talk to Claude should not pay for it
+    import anthropic
+
+class TokenBudgeter:
+    """Token accounting for a request: a fast local estimate, optionally calibrated against the API"""
+    
+    def __init__(self, context_window: int = CONTEXT_WINDOW_TOKENS, doc_budget: int = DOC_TOKEN_BUDGET,
+                 chars_per_token: float = DEFAULT_CHARS_PER_TOKEN):
+        self.context_window = context_window
+        self.doc_budget = doc_budget
+        self.chars_per_token = chars_per_token
+        self.calibrated = False
+        self._calibration_lock = threading.Lock()
+    
+    def estimate(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token) + 1
+    
+    def calibrate(self, client: 'anthropic.Anthropic', model: str, sample_text: str) -> float:
+        """Fit chars_per_token to the API's own count for a sample of the corpus (runs once)"""
+        with self._calibration_lock:
+            if self.calibrated or not sample_text:
+                return self.chars_per_token
+            try:
+                def count(text: str) -> int:
+                    return client.messages.count_tokens(
+                        model=model, messages=[{"role": "user", "content": text}]
+                    ).input_tokens
+                
+                # Subtract the fixed per-message overhead measured on a near-empty message
+                tokens = count(sample_text) - count(".")
+                if tokens > 0:
+                    self.chars_per_token = len(sample_text) / tokens
+            except Exception:
+                pass  # Keep the default ratio; calibration is best effort
+            self.calibrated = True
+            return self.chars_per_token
+    
+    def documentation_budget(self, reserved_texts: List[str], max_tokens: int) -> int:
+        """Tokens left for documentation after instructions, history, question and the answer itself"""
+        reserved = sum(self.estimate(text) for text in reserved_texts) + max_tokens
+        available = int(self.context_window * (1 - CONTEXT_SAFETY_MARGIN)) - reserved
+        if self.doc_budget is not None:
+            available = min(available, self.doc_budget)
+        return max(0, available)
+    
+    def estimate_request(self, request: Dict) -> int:
+        """Input tokens of a Messages API request (JSON framing included, so slightly high)"""
+        return self.estimate(json.dumps([request.get('system'), request.get('messages')], ensure_ascii=False))
+    
+    def pack(self, items: List[tuple], budget: int) -> List:
+        """First-fit over (payload, tokens) in ranked order; an item that does not fit is skipped, not fatal"""
+        selected = []
+        used = 0
+        for payload, tokens in items:
+            if used + tokens <= budget:
+                selected.append(payload)
+                used += tokens
+        return selected
+
+class RateLimiter:
+    """Process-wide token buckets for requests and input tokens per minute
+    
+    Each call reserves its share up front, even when that puts a bucket in debt, and then sleeps
+    until the debt is repaid. Callers are therefore served in arrival order across all sessions.
+    """
+    
+    def __init__(self, requests_per_minute: int = RATE_LIMIT_RPM, input_tokens_per_minute: int = RATE_LIMIT_INPUT_TPM):
+        self.requests_per_minute = requests_per_minute
+        self.input_tokens_per_minute = input_tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(input_tokens_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.granted = 0
+        self.total_wait = 0.0
+        self.last_wait = 0.0
+    
+    def _reserve(self, input_tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+            self._tokens = min(self.input_tokens_per_minute, self._tokens + elapsed * self.input_tokens_per_minute / 60)
+            
+            self._requests -= 1
+            self._tokens -= min(input_tokens, self.input_tokens_per_minute)
+            wait = max(
+                0.0,
+                -self._requests * 60 / self.requests_per_minute,
+                -self._tokens * 60 / self.input_tokens_per_minute,
+                self._paused_until - now
+            )
+            
+            self.granted += 1
+            self.total_wait += wait
+            self.last_wait = wait
+            if wait > 0:
+                self.waiting += 1
+            return wait
+    
+    def _finish_waiting(self):
+        with self._lock:
+            self.waiting -= 1
+    
+    def acquire(self, input_tokens: int):
+        wait = self._reserve(input_tokens)
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                self._finish_waiting()
+    
+    async def acquire_async(self, input_tokens: int):
+        wait = self._reserve(input_tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._finish_waiting()
+    
+    def pause(self, seconds: float):
+        """Hold every caller back, e.g. for the retry-after of a 429 that proves our limits too generous"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "queue_depth": self.waiting,
+                "granted": self.granted,
+                "last_wait_seconds": round(self.last_wait, 3),
+                "average_wait_seconds": round(self.total_wait / self.granted, 3) if self.granted else 0.0
+            }
+
+def is_rate_limit(error: Exception) -> bool:
+    return getattr(error, 'status_code', None) == 429
+
+def is_retryable(error: Exception) -> bool:
+    import anthropic  # Loaded already by whichever client raised the error
+    
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+def retry_delay(attempt: int, error: Exception) -> float:
+    """Honor retry-after when the API sends one, otherwise full-jitter exponential backoff"""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            # A little jitter on top keeps queued callers from retrying in lockstep
+            return float(response.headers.get('retry-after')) + random.uniform(0, RETRY_BASE_DELAY)
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+class AsyncAnswerEngine:
+    """Runs Messages API calls on one shared event loop and coalesces identical in-flight requests
+    
+    Requests with the same key (prompt plus corpus version) share a single upstream call; every
+    waiter gets the same result, and streaming waiters see the same partial text.
+    """
+    
+    def __init__(self, client: 'anthropic.AsyncAnthropic', limiter: RateLimiter = None, metrics: Metrics = None):
+        self.client = client
+        self.limiter = limiter
+        self.metrics = metrics or Metrics()
+        self._inflight = {}  # Only touched from the loop thread
+        self._loop = None
+        self._loop_lock = threading.Lock()
+    
+    @staticmethod
+    def request_key(request: Dict, corpus_version: str) -> str:
+        payload = json.dumps(request, sort_keys=True, default=str)
+        return hashlib.sha256(f"{corpus_version}\0{payload}".encode('utf-8')).hexdigest()
+    
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="answer-engine", daemon=True).start()
+                self._loop = loop
+            return self._loop
+    
+    async def _run(self, key: str, request: Dict, inflight: Dict, input_tokens: int) -> str:
+        try:
+            for attempt in range(MAX_RETRIES + 1):
+                if self.limiter:
+                    with self.metrics.span("queue"):
+                        await self.limiter.acquire_async(input_tokens)
+                try:
+                    inflight['text'] = ""
+                    async with self.client.messages.stream(**request) as stream:
+                        async for text in stream.text_stream:
+                            inflight['text'] += text
+                            for listener in list(inflight['listeners']):
+                                listener(inflight['text'])
+                        self.metrics.record_usage((await stream.get_final_message()).usage)
+                    return inflight['text']
+                except Exception as e:
+                    if attempt >= MAX_RETRIES or not is_retryable(e):
+                        raise
+                    self.metrics.record_error(e, "llm_retry")
+                    delay = retry_delay(attempt, e)
+                    if self.limiter and is_rate_limit(e):
+                        self.limiter.pause(delay)
+                    await asyncio.sleep(delay)
+        finally:
+            self._inflight.pop(key, None)
+    
+    async def generate(self, request: Dict, key: str, on_text: Callable[[str], None] = None,
+                       input_tokens: int = 0) -> str:
+        """Answer the request, joining an identical call already in flight if there is one"""
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = {'text': "", 'listeners': []}
+            inflight['task'] = asyncio.ensure_future(self._run(key, request, inflight, input_tokens))
+            self._inflight[key] = inflight
+        
+        if on_text:
+            inflight['listeners'].append(on_text)
+            if inflight['text']:
+                on_text(inflight['text'])
+        try:
+            # Shielded so one waiter going away does not cancel the call for everyone else
+            return await asyncio.shield(inflight['task'])
+        finally:
+            if on_text in inflight['listeners']:
+                inflight['listeners'].remove(on_text)
+    
+    def generate_blocking(self, request: Dict, key: str, on_text: Callable[[str], None] = None,
+                          input_tokens: int = 0) -> str:
+        """generate() for synchronous callers; on_text is called on the calling thread"""
+        updates = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self.generate(request, key, updates.put if on_text else None, input_tokens), self._ensure_loop()
+        )
+        if on_text is None:
+            return future.result()
+        
+        while not future.done():
+            concurrent.futures.wait([future], timeout=STREAM_UPDATE_INTERVAL)
+            latest = None
+            try:
+                while True:
+                    latest = updates.get_nowait()
+            except queue.Empty:
+                pass
+            if latest is not None:
+                on_text(latest)
+        
+        response_text = future.result()
+        on_text(response_text)
+        return response_text
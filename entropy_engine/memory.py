@@ -0,0 +1,120 @@
+"""Bounded conversation memory: a rolling summary of older turns plus the latest turns verbatim"""
+import logging
+import re
+import threading
+from typing import Callable, Dict, List, Tuple
+
+from .config import CONVERSATION_TURNS, HISTORY_TOKEN_BUDGET, SUMMARY_TOKEN_BUDGET
+from .llm import TokenBudgeter
+
+logger = logging.getLogger("entropy_engine")
+
+def exchange_texts(exchange: Dict) -> Tuple[str, str]:
+    # Handle both old string format and new dict format
+    answer = exchange['answer']
+    return exchange['question'], answer['text'] if isinstance(answer, dict) else answer
+
+class ConversationMemory:
+    """Splits a conversation into a summary of its older exchanges and its newest exchanges
+
+    The newest exchanges that fit the history budget are sent verbatim. Everything older is
+    folded into a summary once, when it leaves that window, and the summary is kept on the
+    newest exchange it covers. The conversation (session state in the app) is therefore also
+    the cache, and each turn folds in at most the exchanges that just aged out.
+
+    A summary written by the model is never waited for: fold_in_background starts it after an
+    answer, and until it lands the exchanges it will cover are sent verbatim after the previous
+    summary. The extractive summary costs nothing and is folded in place.
+    """
+
+    def __init__(self, budgeter: TokenBudgeter, summarize: Callable[[str, List[Dict]], str] = None,
+                 history_budget: int = HISTORY_TOKEN_BUDGET, summary_budget: int = SUMMARY_TOKEN_BUDGET,
+                 max_turns: int = CONVERSATION_TURNS):
+        self.budgeter = budgeter
+        self.summarize = summarize
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.max_turns = max_turns
+        self._folding = set()  # id() of the exchanges whose summary is being written
+        self._folding_lock = threading.Lock()
+
+    def split(self, conversation_history: List[Dict]) -> Tuple[str, List[Dict]]:
+        """Return (summary of older exchanges, exchanges to send verbatim); never calls the model
+
+        Exchanges that left the window but are not summarized yet come first among the verbatim ones.
+        """
+        history = conversation_history or []
+        recent = self.recent(history)
+        older = history[:len(history) - len(recent)]
+        summary, pending = self.covered(older)
+        if pending and not self.summarize:
+            summary = self.extractive_fold(summary, pending)
+            older[-1]['summary'] = summary
+            pending = []
+        return summary, pending + recent
+
+    def fold_in_background(self, conversation_history: List[Dict]):
+        """Summarize, on a daemon thread, the exchanges that have left the verbatim window"""
+        history = conversation_history or []
+        older = history[:len(history) - len(self.recent(history))]
+        summary, pending = self.covered(older)
+        if not pending or not self.summarize:
+            return
+        newest = older[-1]
+        with self._folding_lock:
+            if id(newest) in self._folding:
+                return
+            self._folding.add(id(newest))
+
+        def run():
+            try:
+                newest['summary'] = self.fold(summary, pending)
+            finally:
+                with self._folding_lock:
+                    self._folding.discard(id(newest))
+
+        threading.Thread(target=run, name="conversation-summary", daemon=True).start()
+
+    def recent(self, history: List[Dict]) -> List[Dict]:
+        """Newest exchanges within the verbatim budget, oldest first; always at least the last one"""
+        budget = self.history_budget - self.summary_budget
+        recent = []
+        used = 0
+        for exchange in reversed(history[-self.max_turns:]):
+            tokens = sum(self.budgeter.estimate(text) for text in exchange_texts(exchange))
+            if recent and used + tokens > budget:
+                break
+            recent.append(exchange)
+            used += tokens
+        recent.reverse()
+        return recent
+
+    def covered(self, older: List[Dict]) -> Tuple[str, List[Dict]]:
+        """(newest stored summary, the older exchanges it does not cover yet)"""
+        # Start from the newest exchange that already carries a summary of everything before it
+        for i in range(len(older) - 1, -1, -1):
+            if older[i].get('summary') is not None:
+                return older[i]['summary'], older[i + 1:]
+        return "", older
+
+    def fold(self, summary: str, exchanges: List[Dict]) -> str:
+        if self.summarize:
+            try:
+                folded = self.summarize(summary, exchanges).strip()
+                if folded:
+                    return folded
+            except Exception as e:
+                logger.warning("Conversation summary failed, keeping an extractive one: %s", e)
+        return self.extractive_fold(summary, exchanges)
+
+    def extractive_fold(self, summary: str, exchanges: List[Dict]) -> str:
+        """Question plus the answer's opening sentence per exchange, dropping the oldest lines past the budget"""
+        lines = summary.splitlines() if summary else []
+        for exchange in exchanges:
+            question, answer_text = exchange_texts(exchange)
+            first_sentence = re.split(r"(?<=[.!?])\s", answer_text.strip(), maxsplit=1)[0]
+            lines.append(f"- Asked: {question.strip()} / Answered: {first_sentence}")
+
+        while len(lines) > 1 and self.budgeter.estimate("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        return "\n".join(lines)
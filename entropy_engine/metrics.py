@@ -0,0 +1,249 @@
+"""Stage timings, token usage and error counts, exported as Prometheus text or JSON"""
+import bisect
+import contextvars
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Tuple
+
+from .config import METRICS_LOG_JSON
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HELP = {
+    "entropy_answers_total": "Answers by outcome (answered, cached, direct, no_docs, error)",
+    "entropy_routes_total": "Routing decisions by tier and reason",
+    "entropy_answer_cache_total": "Answer cache lookups by result",
+    "entropy_errors_total": "Errors by exception type and stage",
+    "entropy_llm_tokens_total": "Tokens reported by the Messages API, by kind",
+    "entropy_stage_seconds": "Time spent in each stage of answering",
+    "entropy_conversation_bytes": "Size of the conversation history sent with each question",
+}
+
+logger = logging.getLogger("entropy_engine.metrics")
+
+# The answer being traced on this thread, if any; spans and usage are copied into it
+_current_trace = contextvars.ContextVar("entropy_trace", default=None)
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(label_key: Tuple, extra: Tuple = ()) -> str:
+    pairs = label_key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Metrics:
+    """Process-wide counters, gauges and histograms
+    
+    Recording is a dict update under one lock, so it is cheap enough for every answer. Gauges
+    that are costly to keep current (memory footprints) come from collectors called at export.
+    """
+    
+    def __init__(self, log_json: bool = METRICS_LOG_JSON):
+        self.log_json = log_json
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+    
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+    
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+    
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+    
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, Dict, float]]]):
+        """Register collector() -> [(gauge name, labels, value)], called on every export"""
+        self._collectors.append(collector)
+    
+    @contextmanager
+    def trace(self, **fields):
+        """Collect the spans and token usage of one answer; logged as a JSON line when enabled"""
+        record = {"event": "answer", **fields, "stages_ms": {}, "tokens": {}}
+        token = _current_trace.set(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            _current_trace.reset(token)
+            record["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            if self.log_json:
+                logger.info(json.dumps(record, default=str))
+    
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe("entropy_stage_seconds", elapsed, stage=stage)
+            record = _current_trace.get()
+            if record is not None:
+                stages = record["stages_ms"]
+                stages[stage] = round(stages.get(stage, 0.0) + elapsed * 1000, 2)
+    
+    def annotate(self, **fields):
+        """Add fields to the answer being traced on this thread, if any"""
+        record = _current_trace.get()
+        if record is not None:
+            record.update(fields)
+    
+    def record_usage(self, usage):
+        """Count the tokens reported in a Messages API response's usage block"""
+        if usage is None:
+            return
+        tokens = {
+            "input": getattr(usage, "input_tokens", 0) or 0,
+            "output": getattr(usage, "output_tokens", 0) or 0,
+            "cache_read": getattr(usage, "cache_read_input_tokens", 0) or 0,
+            "cache_creation": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        }
+        for kind, count in tokens.items():
+            if count:
+                self.inc("entropy_llm_tokens_total", count, kind=kind)
+        record = _current_trace.get()
+        if record is not None:
+            for kind, count in tokens.items():
+                record["tokens"][kind] = record["tokens"].get(kind, 0) + count
+    
+    def record_error(self, error: Exception, stage: str):
+        self.inc("entropy_errors_total", type=type(error).__name__, stage=stage)
+        self.annotate(error=type(error).__name__)
+    
+    def _collected_gauges(self) -> Dict:
+        gauges = {}
+        for collector in list(self._collectors):
+            try:
+                for name, labels, value in collector():
+                    gauges[(name, _label_key(labels))] = value
+            except Exception as e:
+                logger.warning("Metrics collector failed: %s", e)
+        return gauges
+    
+    def snapshot(self) -> Dict:
+        """Everything recorded so far as plain JSON-serializable data"""
+        gauges = self._collected_gauges()
+        with self._lock:
+            counters = dict(self._counters)
+            gauges.update(self._gauges)
+            histograms = {
+                key: {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "buckets": dict(zip([*map(str, histogram.buckets), "+Inf"], histogram.counts)),
+                }
+                for key, histogram in self._histograms.items()
+            }
+        
+        def entries(values: Dict) -> list:
+            return [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(values.items())]
+        
+        return {"counters": entries(counters), "gauges": entries(gauges), "histograms": entries(histograms)}
+    
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        gauges = self._collected_gauges()
+        with self._lock:
+            counters = dict(self._counters)
+            gauges.update(self._gauges)
+            histograms = {
+                key: (histogram.buckets, list(histogram.counts), histogram.sum, histogram.count)
+                for key, histogram in self._histograms.items()
+            }
+        
+        lines = []
+        
+        def header(name: str, kind: str):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+        
+        for kind, values in (("counter", counters), ("gauge", gauges)):
+            last_name = None
+            for (name, labels), value in sorted(values.items()):
+                if name != last_name:
+                    header(name, kind)
+                    last_name = name
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        
+        last_name = None
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            if name != last_name:
+                header(name, "histogram")
+                last_name = name
+            cumulative = 0
+            for bound, bucket_count in zip([*buckets, math.inf], counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        
+        return "\n".join(lines) + "\n"
+
+def serve_metrics(metrics: Metrics, port: int, host: str = "0.0.0.0") -> 'ThreadingHTTPServer':
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                body, content_type = metrics.render_prometheus(), "text/plain; version=0.0.4"
+            elif path == "/metrics.json":
+                body, content_type = json.dumps(metrics.snapshot()), "application/json"
+            else:
+                self.send_error(404)
+                return
+            
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+    
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
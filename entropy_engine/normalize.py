@@ -0,0 +1,135 @@
+"""Turning raw Markdown/MDX into the plain, heading-structured text that goes into prompts"""
+import re
+from collections import Counter
+from typing import Dict, Set
+
+from .config import BOILERPLATE_MIN_FILES, BOILERPLATE_MIN_SHARE
+
+FRONT_MATTER_PATTERN = re.compile(r'\A(?:---|\+\+\+)[ \t]*\n(.*?)\n(?:---|\+\+\+)[ \t]*(?:\n|\Z)', re.DOTALL)
+FRONT_MATTER_TITLE_PATTERN = re.compile(r'^title\s*[:=]\s*["\']?(.+?)["\']?\s*$', re.MULTILINE)
+MDX_STATEMENT_PATTERN = re.compile(r'^(?:import\s.+?\sfrom\s+["\'].+?["\'];?|import\s+["\'].+?["\'];?|export\s.+)$')
+HTML_COMMENT_PATTERN = re.compile(r'<!--.*?-->|\{/\*.*?\*/\}', re.DOTALL)
+HTML_HEADING_PATTERN = re.compile(r'<h([1-6])[^>]*>(.*?)</h\1>', re.IGNORECASE | re.DOTALL)
+LINE_BREAK_TAG_PATTERN = re.compile(r'<br\s*/?>|</?(?:p|div|li|tr|section|details)\b[^>]*>', re.IGNORECASE)
+HTML_ELEMENTS = (
+    "a", "abbr", "aside", "audio", "b", "blockquote", "br", "button", "caption", "center", "cite", "code",
+    "col", "colgroup", "dd", "del", "details", "div", "dl", "dt", "em", "figcaption", "figure", "font",
+    "footer", "h[1-6]", "header", "hr", "i", "iframe", "img", "input", "ins", "kbd", "li", "main", "mark",
+    "nav", "ol", "p", "picture", "pre", "s", "samp", "section", "small", "source", "span", "strike",
+    "strong", "sub", "summary", "sup", "svg", "table", "tbody", "td", "th", "thead", "tr", "u", "ul",
+    "var", "video", "wbr",
+)
+# Known HTML elements (any case) and capitalised JSX components such as <Tabs> or <Tabs.Item>; other
+# angle-bracketed words (<WALLET_ADDRESS>, <pool-url>) are placeholders and stay in the text
+TAG_PATTERN = re.compile(
+    r'</?(?:(?i:' + "|".join(HTML_ELEMENTS) + r')|[A-Z][A-Za-z0-9]*[a-z][A-Za-z0-9]*(?:\.[A-Za-z][A-Za-z0-9]*)*)'
+    r'(?![\w.:-])(?:\s+(?:[^<>"\'{}]|"[^"]*"|\'[^\']*\'|\{[^{}]*\})*)?\s*/?>'
+)
+IMAGE_PATTERN = re.compile(r'!\[[^\]]*\]\([^)]*\)|!\[[^\]]*\]\[[^\]]*\]')
+LINKED_IMAGE_PATTERN = re.compile(r'\[\s*!\[[^\]]*\]\([^)]*\)\s*\]\([^)]*\)')
+LINK_PATTERN = re.compile(r'\[([^\]]+)\]\((?:[^()\s]|\([^()]*\))*(?:\s+"[^"]*")?\)')
+REFERENCE_DEFINITION_PATTERN = re.compile(r'^\s{0,3}\[[^\]]+\]:\s+\S+.*$')
+BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+INLINE_CODE_PATTERN = re.compile(r'`[^`\n]+`')
+
+def normalize_document(content: str) -> str:
+    """Clean text for one document: front-matter, MDX statements, markup and images removed
+    
+    Headings, lists, tables and fenced code are kept, link text is kept without its URL, and the
+    front-matter title becomes the top heading when the page has none. Idempotent.
+    """
+    title = None
+    match = FRONT_MATTER_PATTERN.match(content)
+    if match:
+        title_match = FRONT_MATTER_TITLE_PATTERN.search(match.group(1))
+        title = title_match.group(1) if title_match else None
+        content = content[match.end():]
+    
+    lines = []
+    prose = []
+    in_code_block = False
+    
+    def flush_prose():
+        if prose:
+            lines.extend(normalize_prose("\n".join(prose)).split("\n"))
+            prose.clear()
+    
+    for line in content.splitlines():
+        if line.lstrip().startswith(("```", "~~~")):
+            flush_prose()
+            in_code_block = not in_code_block
+            lines.append(line.rstrip())
+        elif in_code_block:
+            lines.append(line.rstrip())
+        elif not MDX_STATEMENT_PATTERN.match(line.strip()):
+            prose.append(line)
+    flush_prose()
+    
+    text = BLANK_LINES_PATTERN.sub("\n\n", "\n".join(lines)).strip()
+    if title and not text.startswith("#"):
+        text = f"# {title}\n\n{text}" if text else f"# {title}"
+    return text
+
+def normalize_prose(text: str) -> str:
+    # Inline code is set aside so markup inside backticks survives
+    code_spans = []
+    
+    def set_aside(match) -> str:
+        code_spans.append(match.group(0))
+        return f"\x00{len(code_spans) - 1}\x00"
+    
+    text = INLINE_CODE_PATTERN.sub(set_aside, text)
+    text = HTML_COMMENT_PATTERN.sub("", text)
+    text = HTML_HEADING_PATTERN.sub(lambda match: f"\n{'#' * int(match.group(1))} {match.group(2).strip()}\n", text)
+    text = LINKED_IMAGE_PATTERN.sub("", text)
+    text = IMAGE_PATTERN.sub("", text)
+    text = LINE_BREAK_TAG_PATTERN.sub("\n", text)
+    text = TAG_PATTERN.sub("", text)
+    text = LINK_PATTERN.sub(r"\1", text)
+    
+    lines = []
+    for line in text.split("\n"):
+        if REFERENCE_DEFINITION_PATTERN.match(line):
+            continue
+        line = line.rstrip()
+        # Lines left with nothing but separators (emptied badge rows, "|" nav bars) go too
+        if line and not re.search(r'[\w$\x00]', line) and not re.fullmatch(r'\s*(?:[-*_]{3,}|\|?[\s:|-]+\|?)\s*', line):
+            continue
+        lines.append(line)
+    return re.sub(r"\x00(\d+)\x00", lambda match: code_spans[int(match.group(1))], "\n".join(lines))
+
+def paragraphs(text: str) -> list:
+    return [paragraph.strip() for paragraph in re.split(r'\n\s*\n', text) if paragraph.strip()]
+
+def find_boilerplate(documents: Dict[str, str]) -> Set[str]:
+    """Paragraphs (navigation, footers, banners) repeated across a large share of the documents"""
+    if len(documents) < BOILERPLATE_MIN_FILES:
+        return set()
+    
+    counts = Counter()
+    for content in documents.values():
+        counts.update({
+            paragraph for paragraph in paragraphs(content) if not paragraph.startswith(("#", "```", "~~~"))
+        })
+    threshold = max(BOILERPLATE_MIN_FILES, BOILERPLATE_MIN_SHARE * len(documents))
+    return {paragraph for paragraph, count in counts.items() if count >= threshold}
+
+def remove_boilerplate(documents: Dict[str, str], boilerplate: Set[str]) -> Dict[str, str]:
+    """Drop boilerplate paragraphs from every document but the first one (in corpus order) that has them"""
+    if not boilerplate:
+        return documents
+    
+    seen = set()
+    cleaned = {}
+    for file_path, content in documents.items():
+        parts = paragraphs(content)
+        kept = []
+        for paragraph in parts:
+            if paragraph in boilerplate:
+                if paragraph in seen:
+                    continue
+                seen.add(paragraph)
+            kept.append(paragraph)
+        # Untouched documents keep their identity, which the next refresh relies on
+        cleaned[file_path] = content if len(kept) == len(parts) else "\n\n".join(kept)
+    return cleaned
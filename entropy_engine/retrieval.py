@@ -0,0 +1,261 @@
+"""Chunking and lexical, dense and hybrid retrieval over the corpus"""
+import heapq
+import math
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Dict, List
+
+from .config import CHUNK_CHARS, DENSE_DIM, DENSE_NGRAM, HYBRID_ALPHA, RETRIEVAL_MODE, RETRIEVAL_TOP_K
+
+if TYPE_CHECKING:
+    import numpy as np
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+TOKEN_PATTERN = re.compile(r"[a-z0-9$][a-z0-9$_'-]*")
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'how', 'i',
+    'if', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'so', 'that', 'the', 'this', 'to', 'what',
+    'when', 'where', 'which', 'who', 'why', 'with', 'you', 'your'
+}
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Pack paragraphs greedily into pieces of at most max_chars"""
+    pieces = []
+    current = ""
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        # Paragraphs that are too long on their own are cut hard
+        while len(paragraph) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_document(content: str, max_chars: int = CHUNK_CHARS) -> List[Dict]:
+    """Split a document at its markdown headings, keeping the heading trail of each chunk"""
+    chunks = []
+    headings = []
+    lines = []
+    
+    def flush():
+        text = "\n".join(lines).strip()
+        lines.clear()
+        if text:
+            heading = " > ".join(title for _, title in headings)
+            chunks.extend({"heading": heading, "text": piece} for piece in split_text(text, max_chars))
+    
+    in_code_block = False
+    for line in content.splitlines():
+        if line.lstrip().startswith(("```", "~~~")):
+            in_code_block = not in_code_block
+        match = None if in_code_block else HEADING_PATTERN.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, match.group(2)))
+        else:
+            lines.append(line)
+    flush()
+    
+    return chunks
+
+class BM25Index:
+    """Inverted index over document chunks with Okapi BM25 scoring"""
+    
+    def __init__(self, chunks: List[Dict], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.lengths = []
+        
+        for chunk_id, chunk in enumerate(chunks):
+            # Path and heading words count as chunk text so "ashlar setup" finds ashlar.md#setup
+            tokens = tokenize(f"{chunk['path']} {chunk['heading']} {chunk['text']}")
+            self.lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self.postings[term].append((chunk_id, frequency))
+        
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        total = len(chunks)
+        self.idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+    
+    def search(self, query: str, top_k: int = RETRIEVAL_TOP_K) -> List[tuple]:
+        """Return (chunk_id, score) pairs for the best matching chunks, best first"""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id, frequency in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / self.average_length)
+                scores[chunk_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+class DenseIndex:
+    """Hashed character n-gram TF-IDF vectors kept in one contiguous float32 matrix
+    
+    Runs offline on the CPU; a query is scored with a single matrix-vector product. numpy is
+    imported on first use, so importing the engine stays cheap.
+    """
+    
+    def __init__(self, matrix: 'np.ndarray', idf: 'np.ndarray'):
+        self.matrix = matrix
+        self.idf = idf
+        self.dim = matrix.shape[1]
+        self._features = {}
+    
+    def _token_buckets(self, token: str) -> 'np.ndarray':
+        buckets = self._features.get(token)
+        if buckets is None:
+            import numpy as np
+            
+            # The whole word plus its character n-grams, so "miners" still lands near "mining";
+            # crc32 keeps the hashing stable across processes for snapshotted matrices
+            padded = f"<{token}>"
+            grams = [padded] + [padded[i:i + DENSE_NGRAM] for i in range(len(padded) - DENSE_NGRAM + 1)]
+            buckets = np.array([zlib.crc32(gram.encode('utf-8')) % self.dim for gram in grams], dtype=np.intp)
+            if len(self._features) < 200000:
+                self._features[token] = buckets
+        return buckets
+    
+    def _counts(self, text: str) -> 'np.ndarray':
+        import numpy as np
+        
+        token_counts = Counter(tokenize(text))
+        if not token_counts:
+            return np.zeros(self.dim, dtype=np.float32)
+        buckets = [self._token_buckets(token) for token in token_counts]
+        weights = np.repeat(np.fromiter(token_counts.values(), dtype=np.float32), [len(b) for b in buckets])
+        return np.bincount(np.concatenate(buckets), weights=weights, minlength=self.dim).astype(np.float32)
+    
+    @staticmethod
+    def _normalize(vectors: 'np.ndarray') -> 'np.ndarray':
+        import numpy as np
+        
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+    
+    @classmethod
+    def build(cls, texts: List[str], dim: int = DENSE_DIM) -> 'DenseIndex':
+        import numpy as np
+        
+        index = cls(np.zeros((0, dim), dtype=np.float32), np.ones(dim, dtype=np.float32))
+        counts = np.vstack([index._counts(text) for text in texts]) if texts else index.matrix
+        
+        document_frequency = np.count_nonzero(counts, axis=0)
+        index.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        index.matrix = np.ascontiguousarray(index._normalize(np.log1p(counts) * index.idf), dtype=np.float32)
+        return index
+    
+    def scores(self, query: str) -> 'np.ndarray':
+        import numpy as np
+        
+        query_vector = self._normalize(np.log1p(self._counts(query)) * self.idf).astype(np.float32)
+        return self.matrix @ query_vector
+    
+    def search(self, query: str, top_k: int = RETRIEVAL_TOP_K) -> List[tuple]:
+        return self.top(self.scores(query), top_k)
+    
+    @staticmethod
+    def top(scores: 'np.ndarray', top_k: int) -> List[tuple]:
+        import numpy as np
+        
+        if len(scores) > top_k:
+            candidates = np.argpartition(scores, -top_k)[-top_k:]
+        else:
+            candidates = np.arange(len(scores))
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [(int(chunk_id), float(scores[chunk_id])) for chunk_id in ranked if scores[chunk_id] > 0]
+
+def combine_hybrid(lexical: Dict[int, float], dense: Dict[int, float], top_k: int, alpha: float) -> List[tuple]:
+    """Blend BM25 and dense scores over the candidates of both, BM25 scaled by the best hit into [0, 1]"""
+    best_lexical = max(lexical.values(), default=0.0) or 1.0
+    combined = {
+        chunk_id: alpha * dense_score + (1 - alpha) * lexical.get(chunk_id, 0.0) / best_lexical
+        for chunk_id, dense_score in dense.items()
+    }
+    return heapq.nlargest(top_k, combined.items(), key=lambda item: item[1])
+
+class RetrievalIndex:
+    """Chunks of the corpus with their lexical and dense indexes, swapped in as one unit"""
+    
+    def __init__(self, chunks: List[Dict], dense: DenseIndex = None):
+        self.chunks = chunks
+        self.lexical = BM25Index(chunks)
+        self.dense = dense
+    
+    def has_term(self, term: str) -> bool:
+        return term in self.lexical.idf
+    
+    def hybrid_candidates(self, query: str, top_k: int) -> tuple:
+        """({chunk_id: BM25 score}, {chunk_id: dense score}) over the best chunks by either signal"""
+        lexical = dict(self.lexical.search(query, top_k))
+        dense_scores = self.dense.scores(query)
+        candidates = set(lexical) | {chunk_id for chunk_id, _ in self.dense.top(dense_scores, top_k)}
+        return lexical, {chunk_id: float(dense_scores[chunk_id]) for chunk_id in candidates}
+    
+    def search(self, query: str, top_k: int = RETRIEVAL_TOP_K, mode: str = RETRIEVAL_MODE,
+               alpha: float = HYBRID_ALPHA) -> List[tuple]:
+        if mode == "lexical" or self.dense is None:
+            return self.lexical.search(query, top_k)
+        if mode == "dense":
+            return self.dense.search(query, top_k)
+        
+        lexical, dense = self.hybrid_candidates(query, top_k * 3)
+        return combine_hybrid(lexical, dense, top_k, alpha)
+
+class ShardedIndex:
+    """Several RetrievalIndexes, one per source, searched as one
+    
+    Chunk ids run through the shards in order. Each shard keeps its own BM25 statistics and
+    dense matrix, so a source is re-indexed alone; results are merged on one scale, with BM25
+    scaled by the best hit across all shards as a single hybrid index would.
+    """
+    
+    def __init__(self, shards: List[RetrievalIndex]):
+        self.shards = shards
+        self.offsets = []
+        self.chunks = []
+        for shard in shards:
+            self.offsets.append(len(self.chunks))
+            self.chunks.extend(shard.chunks)
+    
+    def has_term(self, term: str) -> bool:
+        return any(shard.has_term(term) for shard in self.shards)
+    
+    def search(self, query: str, top_k: int = RETRIEVAL_TOP_K, mode: str = RETRIEVAL_MODE,
+               alpha: float = HYBRID_ALPHA) -> List[tuple]:
+        if mode in ("lexical", "dense") or any(shard.dense is None for shard in self.shards):
+            hits = [
+                (offset + chunk_id, score)
+                for offset, shard in zip(self.offsets, self.shards)
+                for chunk_id, score in shard.search(query, top_k, mode)
+            ]
+            return heapq.nlargest(top_k, hits, key=lambda item: item[1])
+        
+        lexical, dense = {}, {}
+        for offset, shard in zip(self.offsets, self.shards):
+            shard_lexical, shard_dense = shard.hybrid_candidates(query, top_k * 3)
+            lexical.update((offset + chunk_id, score) for chunk_id, score in shard_lexical.items())
+            dense.update((offset + chunk_id, score) for chunk_id, score in shard_dense.items())
+        return combine_hybrid(lexical, dense, top_k, alpha)
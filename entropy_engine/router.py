@@ -0,0 +1,102 @@
+"""Deciding locally, before any Claude call, how much model a question needs"""
+import logging
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from .cache import normalize_question
+from .config import MODEL_TIERS, ROUTE_COMPLEX_SCORE, ROUTE_SIMPLE_MAX_TERMS
+from .retrieval import RetrievalIndex, tokenize
+
+logger = logging.getLogger("entropy_engine.router")
+
+GREETING_PATTERN = re.compile(r'^(?:hi+|hey+|hello+|yo|gm|good (?:morning|afternoon|evening)|howdy|sup|what ?s up)(?: there)?$')
+ACKNOWLEDGEMENT = r'(?:ok(?:ay)?|great|cool|nice|awesome|perfect|got it)'
+# A bare "ok" or "cool" is not thanks; it may be the start of a question
+THANKS_PATTERN = re.compile(rf'^(?:{ACKNOWLEDGEMENT} ?)*(?:thanks?(?: you)?(?: so much)?|thx|ty|cheers)(?: ?{ACKNOWLEDGEMENT})*$')
+GOODBYE_PATTERN = re.compile(r'^(?:bye|goodbye|see (?:you|ya)|later|cya)$')
+COMPLEX_CUES = re.compile(
+    r'\b(?:why|compare|comparison|difference|differences|versus|vs|explain|pros|cons|trade-?offs?|'
+    r'troubleshoot|debug|not working|doesn\'t work|error|fails?|failing|step by step|walk me through|'
+    r'in detail|detailed|elaborate|simpler terms|strategy|should i|best way)\b'
+)
+
+GREETING_REPLY = (
+    "Hi! I'm the Entropy documentation assistant. Ask me anything about Entropy, Ashlar mining devices, "
+    "$ENT tokens or the community rules."
+)
+THANKS_REPLY = "You're welcome! Let me know if you have any other questions about Entropy."
+GOODBYE_REPLY = "Goodbye, and happy mining!"
+
+class Route(NamedTuple):
+    tier: str  # "direct", or a key of MODEL_TIERS
+    reason: str
+    reply: Optional[str] = None
+    
+    def settings(self, tiers: Dict[str, Dict] = MODEL_TIERS) -> Dict:
+        return tiers[self.tier]
+
+class QueryRouter:
+    """Rules plus a small complexity score over the retrieval index
+    
+    Small talk is answered directly, short lookups that land in one or two files go to the small
+    tier and the rest go to the large one. Questions that share no word with the corpus also go to
+    the small tier: they may be on topic in other words ("hooking up the box?"), and the model
+    declines the ones that are not. Follow-ups always get a model, since they lean on the
+    conversation rather than the corpus.
+    """
+    
+    def __init__(self, tiers: Dict[str, Dict] = MODEL_TIERS, simple_max_terms: int = ROUTE_SIMPLE_MAX_TERMS,
+                 complex_score: float = ROUTE_COMPLEX_SCORE):
+        self.tiers = tiers
+        self.simple_max_terms = simple_max_terms
+        self.complex_score = complex_score
+    
+    def route(self, question: str, conversation_history: List[Dict] = None, index: RetrievalIndex = None) -> Route:
+        route = self._route(question, conversation_history, index)
+        logger.info("route=%s reason=%s chars=%d turn=%d", route.tier, route.reason, len(question),
+                    len(conversation_history or []) + 1)
+        return route
+    
+    def _route(self, question: str, conversation_history: List[Dict], index: RetrievalIndex) -> Route:
+        normalized = normalize_question(question)
+        if GREETING_PATTERN.match(normalized):
+            return Route("direct", "greeting", GREETING_REPLY)
+        if THANKS_PATTERN.match(normalized):
+            return Route("direct", "thanks", THANKS_REPLY)
+        if GOODBYE_PATTERN.match(normalized):
+            return Route("direct", "goodbye", GOODBYE_REPLY)
+        
+        if "small" not in self.tiers:
+            return Route("large", "no small tier")
+        if conversation_history:
+            return Route("large", "follow-up")
+        
+        terms = tokenize(question)
+        if index is None or not index.chunks:
+            return Route("large", "no index")
+        
+        # Neither BM25 nor the character n-gram vectors separate unfamiliar wording from unrelated
+        # questions reliably, so nothing is declined on vocabulary alone
+        if not any(index.has_term(term) for term in terms):
+            return Route("small", "unknown-vocabulary")
+        
+        score = self.complexity(question, terms, index)
+        if len(terms) <= self.simple_max_terms and score < self.complex_score:
+            return Route("small", f"lookup score={score:.2f}")
+        return Route("large", f"complex score={score:.2f}")
+    
+    def complexity(self, question: str, terms: List[str], index: RetrievalIndex) -> float:
+        """Roughly 0 for "what is X" lookups, 1 and up for questions that need reasoning across the docs"""
+        score = 0.0
+        if COMPLEX_CUES.search(question.lower()):
+            score += 1.0
+        # Several questions or clauses in one message
+        score += 0.5 * max(0, question.count("?") - 1)
+        score += 0.25 * len(re.findall(r'\b(?:and|also|then|or)\b', question.lower()))
+        score += 0.05 * len(terms)
+        
+        # Lookups concentrate on one or two files; broad questions spread across many
+        hits = index.search(question, 5, mode="lexical")
+        files = {index.chunks[chunk_id]['path'] for chunk_id, _ in hits}
+        score += 0.2 * max(0, len(files) - 2)
+        return score
@@ -0,0 +1,135 @@
+"""On-disk corpus snapshots"""
+import hashlib
+import json
+import mmap
+import os
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class SnapshotStore:
+    """On-disk copy of the corpus so a restarted process can answer before touching the network
+    
+    Layout: snapshot.json is the manifest for one tree SHA, blobs/<key> holds a document's
+    normalized text under the SHA-1 of that text, and derived/<kind>/<key>.json holds structures
+    computed from it (or from the whole corpus). Normalization depends on the corpus-wide
+    boilerplate set, so keys follow the normalized text rather than the git blob it came from.
+    """
+    FORMAT_VERSION = 3  # 3: blobs and derived entries keyed by normalized text, not git blob SHA
+    
+    def __init__(self, root: str):
+        self.root = root
+        self.manifest_path = os.path.join(root, "snapshot.json")
+        self.blob_dir = os.path.join(root, "blobs")
+        self.derived_dir = os.path.join(root, "derived")
+    
+    @staticmethod
+    def _read_text(path: str) -> str:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[:].decode('utf-8')
+    
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    
+    def load(self, repo: str) -> Dict:
+        """Return the manifest with a "documents" mapping added, or None if there is no usable snapshot"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('format') != self.FORMAT_VERSION or manifest.get('repo') != repo:
+                return None
+            
+            manifest['documents'] = {
+                file_path: self._read_text(os.path.join(self.blob_dir, key))
+                for file_path, _, key in manifest['files']
+            }
+            return manifest
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def save(self, repo: str, branch: str, tree_sha: str, tree_etag: str, documents: Dict[str, str],
+             blob_shas: Dict[str, str], boilerplate: Iterable[str] = (), derived_keys: Iterable[str] = ()):
+        files = []
+        for file_path, content in documents.items():
+            data = content.encode('utf-8')
+            key = hashlib.sha1(data).hexdigest()
+            blob_path = os.path.join(self.blob_dir, key)
+            # Blobs are content-addressed, so unchanged files are never rewritten
+            if not os.path.exists(blob_path):
+                self._write_atomic(blob_path, data)
+            files.append([file_path, blob_shas.get(file_path), key])
+        
+        manifest = {
+            'format': self.FORMAT_VERSION,
+            'repo': repo,
+            'branch': branch,
+            'tree_sha': tree_sha,
+            'tree_etag': tree_etag,
+            'saved_at': datetime.now().isoformat(),
+            'files': files,
+            'boilerplate': sorted(boilerplate),
+        }
+        self._write_atomic(self.manifest_path, json.dumps(manifest).encode('utf-8'))
+        self.prune({key for _, _, key in files} | set(derived_keys))
+    
+    def load_array(self, kind: str, key: str) -> 'np.ndarray':
+        import numpy as np
+        
+        try:
+            return np.load(os.path.join(self.derived_dir, kind, f"{key}.npy"), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+    
+    def save_array(self, kind: str, key: str, array: 'np.ndarray'):
+        import numpy as np
+        
+        path = os.path.join(self.derived_dir, kind, f"{key}.npy")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+    
+    def load_derived(self, kind: str, key: str):
+        try:
+            with open(os.path.join(self.derived_dir, kind, f"{key}.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def save_derived(self, kind: str, key: str, data):
+        try:
+            self._write_atomic(os.path.join(self.derived_dir, kind, f"{key}.json"), json.dumps(data).encode('utf-8'))
+        except OSError:
+            pass
+    
+    def prune(self, live_keys: set):
+        """Remove blobs and derived entries that no longer belong to the current tree"""
+        directories = [self.blob_dir]
+        if os.path.isdir(self.derived_dir):
+            directories += [os.path.join(self.derived_dir, kind) for kind in os.listdir(self.derived_dir)]
+        
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.split('.', 1)[0] not in live_keys:
+                    try:
+                        os.remove(os.path.join(directory, name))
+                    except OSError:
+                        pass
@@ -0,0 +1,220 @@
+"""Several documentation repositories served as one corpus, each kept as its own shard"""
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .citations import CitationIndex
+from .config import CORPUS_TTL, DOC_EXTENSIONS, GITHUB_API_URL, SOURCES, SOURCES_FILE
+from .corpus import EMPTY_STATE, CorpusState, DocsCorpus
+from .events import EngineEvents
+from .github import DocsFetcher
+from .retrieval import ShardedIndex
+from .snapshot import SnapshotStore
+
+logger = logging.getLogger("entropy_engine.sources")
+
+class Source(NamedTuple):
+    name: str
+    owner: str
+    repo: str
+    branch: Optional[str] = None
+    include: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+    extensions: Tuple[str, ...] = tuple(DOC_EXTENSIONS)
+    ttl: timedelta = CORPUS_TTL
+    scheduled: bool = True
+    prefix: str = ""
+    
+    def is_doc(self, file_path: str) -> bool:
+        if not file_path.endswith(self.extensions):
+            return False
+        if self.include and not any(fnmatch.fnmatch(file_path, pattern) for pattern in self.include):
+            return False
+        return not any(fnmatch.fnmatch(file_path, pattern) for pattern in self.exclude)
+
+def load_sources(entries: List[Dict] = None, path: str = SOURCES_FILE) -> List[Source]:
+    """Sources from a JSON file when path is set, otherwise from entries (SOURCES by default)"""
+    if entries is None:
+        if path:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        else:
+            entries = SOURCES
+    
+    sources = []
+    for position, entry in enumerate(entries):
+        entry = dict(entry)
+        ttl_minutes = entry.pop('ttl_minutes', None)
+        if ttl_minutes is not None:
+            entry['ttl'] = timedelta(minutes=ttl_minutes)
+        for key in ('include', 'exclude', 'extensions'):
+            if key in entry:
+                entry[key] = tuple(entry[key])
+        # The first source keeps bare paths; the others are told apart by their name
+        entry.setdefault('prefix', "" if position == 0 else f"{entry['name']}/")
+        sources.append(Source(**entry))
+    
+    names = [source.name for source in sources]
+    if not sources or len(set(names)) != len(names):
+        raise ValueError(f"sources need unique names and at least one entry, got {names}")
+    return sources
+
+class CorpusSet:
+    """One DocsCorpus per source behind the interface the chatbot uses from a single corpus
+    
+    Every shard fetches, refreshes, snapshots and indexes on its own schedule. Whenever one
+    publishes a new version, the merged view (documents, a ShardedIndex over the shard indexes,
+    citations with each source's URLs, and a combined version) is rebuilt from the shards'
+    current states and published as one CorpusState. Nothing is re-indexed for that: the merge
+    only concatenates references.
+    """
+    
+    def __init__(self, sources: List[Source], store_root: str = None, api_url: str = GITHUB_API_URL):
+        self.sources = sources
+        self.shards = []  # (corpus, fetcher) per source, in source order
+        for position, source in enumerate(sources):
+            store = None
+            if store_root:
+                # The first source keeps the snapshot directory it had before there were several
+                store = SnapshotStore(store_root if position == 0 else os.path.join(store_root, "sources", source.name))
+            corpus = DocsCorpus(source.owner, source.repo, cache_duration=source.ttl, store=store,
+                                branch=source.branch, is_doc=source.is_doc, prefix=source.prefix)
+            corpus.add_listener(lambda _corpus: self.merge())
+            self.shards.append((corpus, DocsFetcher(corpus, api_url)))
+        
+        primary = self.shards[0][0]
+        self.repo_owner = primary.repo_owner
+        self.repo_name = primary.repo_name
+        self.state = EMPTY_STATE
+        self._listeners = []
+        self._merge_lock = threading.Lock()
+        self.merge()
+    
+    @property
+    def documents(self) -> Dict[str, str]:
+        return self.state.documents
+    
+    @property
+    def index(self):
+        return self.state.index
+    
+    @property
+    def citations(self) -> Optional[CitationIndex]:
+        return self.state.citations
+    
+    @property
+    def version(self) -> Optional[str]:
+        return self.state.version
+    
+    @property
+    def timestamp(self):
+        return self.state.timestamp
+    
+    @property
+    def refresh_failures(self) -> int:
+        return sum(corpus.refresh_failures for corpus, _ in self.shards)
+    
+    @property
+    def normalization(self) -> Dict[str, int]:
+        totals = {}
+        for corpus, _ in self.shards:
+            for key, value in corpus.normalization.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+    
+    def is_valid(self) -> bool:
+        # Each shard has its own TTL; the set is current while every shard that has documents is.
+        # Shards still without any are fetched in the background and must not hold up questions
+        ready = [corpus for corpus, _ in self.shards if corpus.documents]
+        return bool(ready) and all(corpus.is_valid() for corpus in ready)
+    
+    def get_documents(self, fetch: Callable[[EngineEvents], Dict[str, str]] = None,
+                      events: EngineEvents = None) -> Dict[str, str]:
+        """The merged corpus, refreshing expired shards as DocsCorpus.get_documents does
+        
+        Only a set with no documents at all waits for its shards. Otherwise the shards that are
+        ready are served and the empty ones (an unreachable or misconfigured source) are fetched
+        in the background, with their own backoff. fetch is ignored; every shard fetches with its
+        own DocsFetcher.
+        """
+        waiting = not any(corpus.documents for corpus, _ in self.shards)
+        for corpus, fetcher in self.shards:
+            if waiting or corpus.documents:
+                corpus.get_documents(fetcher.fetch_entropy_docs, events)
+            else:
+                corpus.refresh_in_background(fetcher.fetch_entropy_docs)
+        return self.documents
+    
+    def refresh_now(self, fetch: Callable[[EngineEvents], Dict[str, str]] = None,
+                    events: EngineEvents = None) -> bool:
+        """Refresh every shard on this thread, as DocsCorpus.refresh_now; False when any failed
+        
+        fetch is ignored; every shard fetches with its own DocsFetcher.
+        """
+        refreshed = True
+        for corpus, fetcher in self.shards:
+            refreshed &= corpus.refresh_now(fetcher.fetch_entropy_docs, events)
+        return refreshed
+    
+    def start_scheduler(self):
+        for source, (corpus, fetcher) in zip(self.sources, self.shards):
+            if source.scheduled:
+                corpus.start_scheduler(fetcher.fetch_entropy_docs)
+    
+    def stop_scheduler(self):
+        for corpus, _ in self.shards:
+            corpus.stop_scheduler()
+    
+    def add_listener(self, callback: Callable[['CorpusSet'], None]):
+        """Call callback(corpus set) after every merge that changes the combined version"""
+        self._listeners.append(callback)
+    
+    def merge(self):
+        with self._merge_lock:
+            previous_version = self.version
+            states = [corpus.state for corpus, _ in self.shards]
+            ready = [(corpus, state) for (corpus, _), state in zip(self.shards, states) if state.documents]
+            
+            if len(self.shards) == 1:
+                # A single source is served as is, with its own version, index and citations
+                self.state = states[0]
+            elif ready:
+                documents = {}
+                links = {}
+                for corpus, state in ready:
+                    documents.update((corpus.prefix + file_path, content) for file_path, content in state.documents.items())
+                    links.update(state.citations.links if state.citations else corpus.citation_links(state.documents))
+                digest = hashlib.sha1("\n".join(
+                    f"{corpus.prefix}\0{state.version}" for corpus, state in ready
+                ).encode('utf-8'))
+                timestamps = [state.timestamp for state in states]
+                self.state = CorpusState(
+                    documents,
+                    ShardedIndex([state.index for _, state in ready if state.index is not None]),
+                    CitationIndex(links),
+                    digest.hexdigest()[:16],
+                    None if None in timestamps else min(timestamps)
+                )
+        
+        if self.version != previous_version:
+            logger.info("Corpus version %s from %d of %d sources", self.version, len(ready), len(self.shards))
+            for callback in self._listeners:
+                try:
+                    callback(self)
+                except Exception as e:
+                    logger.warning("Corpus listener failed: %s", e)
+    
+    def build_citation_index(self, documents: Dict[str, str] = None) -> CitationIndex:
+        return self.citations or CitationIndex({})
+    
+    def footprint(self) -> Dict[str, int]:
+        totals = {}
+        for corpus, _ in self.shards:
+            for key, value in corpus.footprint().items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
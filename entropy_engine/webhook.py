@@ -0,0 +1,193 @@
+"""GitHub push webhook: refresh the files a push touched as soon as it lands
+
+Point a repository webhook (push events, secret set) at http://host:$ENTROPY_WEBHOOK_PORT/webhook.
+A recorded delivery can be replayed offline to see what it would refresh:
+
+    python -m entropy_engine.webhook payload.json --signature sha256=...
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import parse_qs
+
+from .config import WEBHOOK_MAX_COMMITS, WEBHOOK_SECRET
+from .corpus import DocsCorpus
+from .github import DocsFetcher
+from .sources import CorpusSet, load_sources
+
+logger = logging.getLogger("entropy_engine.webhook")
+
+MAX_PAYLOAD_BYTES = 25 * 1024 * 1024  # GitHub's own cap on webhook payloads
+
+def sign(secret: str, body: bytes) -> str:
+    """The X-Hub-Signature-256 header GitHub sends for body"""
+    return "sha256=" + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+def verify_signature(secret: str, body: bytes, signature: str) -> bool:
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(sign(secret, body), signature.strip())
+
+def parse_payload(body: bytes) -> Dict:
+    # Webhooks can be configured to send JSON or a form-encoded "payload" field
+    if body.startswith(b"payload="):
+        return json.loads(parse_qs(body.decode('utf-8'))['payload'][0])
+    return json.loads(body)
+
+class PushPlan(NamedTuple):
+    changed: List[str]
+    removed: List[str]
+    full: bool  # Refresh from the tree instead; the payload cannot be trusted to list every file
+    reason: str
+
+def plan_push(payload: Dict, corpus: DocsCorpus) -> Optional[PushPlan]:
+    """What a push means for the corpus, or None when it is for another repository or branch"""
+    repository = payload.get('repository') or {}
+    if str(repository.get('full_name', '')).lower() != corpus.repo.lower():
+        return None
+    branch = corpus.branch or repository.get('default_branch')
+    if payload.get('ref') != f"refs/heads/{branch}":
+        return None
+    
+    commits = payload.get('commits') or []
+    if payload.get('forced'):
+        return PushPlan([], [], True, "forced push")
+    if not commits or len(commits) >= WEBHOOK_MAX_COMMITS:
+        return PushPlan([], [], True, f"{len(commits)} commits listed")
+    
+    # Replay the commits in order, so a file added and then removed ends up removed
+    changed, removed = {}, {}
+    for commit in commits:
+        for file_path in commit.get('added', []) + commit.get('modified', []):
+            changed[file_path] = True
+            removed.pop(file_path, None)
+        for file_path in commit.get('removed', []):
+            removed[file_path] = True
+            changed.pop(file_path, None)
+    
+    return PushPlan(
+        [file_path for file_path in changed if corpus.is_doc(file_path)],
+        [file_path for file_path in removed if corpus.is_doc(file_path)],
+        False,
+        f"{len(commits)} commits"
+    )
+
+class PushWebhook:
+    """Verifies deliveries and applies the pushes they describe to every source they touch"""
+    
+    def __init__(self, corpus: Union[DocsCorpus, CorpusSet], fetcher: DocsFetcher = None,
+                 secret: str = WEBHOOK_SECRET):
+        self.shards = corpus.shards if isinstance(corpus, CorpusSet) else [(corpus, fetcher)]
+        self.secret = secret
+    
+    def plan(self, payload: Dict) -> List[Tuple[DocsCorpus, DocsFetcher, PushPlan]]:
+        plans = []
+        for corpus, fetcher in self.shards:
+            plan = plan_push(payload, corpus)
+            if plan is not None and (plan.full or plan.changed or plan.removed):
+                plans.append((corpus, fetcher, plan))
+        return plans
+    
+    def handle(self, event: str, body: bytes, signature: str, background: bool = True) -> Tuple[int, str]:
+        """(HTTP status, message) for one delivery; the refresh runs on its own thread when background"""
+        if not verify_signature(self.secret, body, signature):
+            logger.warning("Rejected webhook delivery with a bad or missing signature")
+            return 401, "bad signature"
+        if event == "ping":
+            return 200, "pong"
+        if event != "push":
+            return 202, f"ignored {event} event"
+        
+        try:
+            plans = self.plan(parse_payload(body))
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, f"bad payload: {e}"
+        if not plans:
+            return 202, "no documentation changes for any source"
+        
+        for corpus, _, plan in plans:
+            logger.info("Push to %s@%s: %s, %d changed, %d removed, full=%s", corpus.repo, corpus.branch,
+                        plan.reason, len(plan.changed), len(plan.removed), plan.full)
+        if background:
+            threading.Thread(target=self.apply, args=(plans,), name="corpus-webhook", daemon=True).start()
+            return 202, "refresh started"
+        return (200, "refreshed") if self.apply(plans) else (502, "refresh failed")
+    
+    def apply(self, plans: List[Tuple[DocsCorpus, DocsFetcher, PushPlan]]) -> bool:
+        refreshed = True
+        for corpus, fetcher, plan in plans:
+            # Without a corpus there is nothing to patch
+            if plan.full or not corpus.documents:
+                refreshed &= corpus.refresh_now(fetcher.fetch_entropy_docs)
+            else:
+                refreshed &= corpus.refresh_now(
+                    lambda events: fetcher.fetch_changed_docs(plan.changed, plan.removed, events)
+                )
+        return refreshed
+
+def serve_webhook(webhook: PushWebhook, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Accept POST /webhook deliveries from a daemon thread"""
+    if not webhook.secret:
+        raise ValueError("the push webhook needs a secret (ENTROPY_WEBHOOK_SECRET)")
+    
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        
+        def do_POST(self):
+            if self.path.split("?", 1)[0] != "/webhook":
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_PAYLOAD_BYTES:
+                self.send_error(413)
+                return
+            
+            status, message = webhook.handle(
+                self.headers.get("X-GitHub-Event", ""), self.rfile.read(length),
+                self.headers.get("X-Hub-Signature-256", "")
+            )
+            data = message.encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+    
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="webhook-server", daemon=True).start()
+    return server
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m entropy_engine.webhook", description=__doc__.splitlines()[0])
+    parser.add_argument("payload", help="recorded push payload (the delivery's request body)")
+    parser.add_argument("--event", default="push", help="X-GitHub-Event of the delivery (default: push)")
+    parser.add_argument("--signature", help="X-Hub-Signature-256 of the delivery, checked against the secret")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET,
+                        help="webhook secret (default: $ENTROPY_WEBHOOK_SECRET)")
+    args = parser.parse_args(argv)
+    
+    with open(args.payload, "rb") as f:
+        body = f.read()
+    if args.signature is not None and not verify_signature(args.secret, body, args.signature):
+        print("signature: invalid", file=sys.stderr)
+        return 1
+    if args.event != "push":
+        print(f"ignored {args.event} event", file=sys.stderr)
+        return 0
+    
+    # Nothing is fetched; the configured sources only supply the repositories and branches to match
+    webhook = PushWebhook(CorpusSet(load_sources()), secret=args.secret)
+    plans = webhook.plan(parse_payload(body))
+    print(json.dumps({f"{corpus.repo}@{corpus.branch or 'default'}": plan._asdict() for corpus, _, plan in plans}, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
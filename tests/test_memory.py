@@ -0,0 +1,37 @@
+import threading
+
+from entropy_engine.llm import TokenBudgeter
+from entropy_engine.memory import ConversationMemory
+
+def conversation(turns: int):
+    return [{"question": f"question {i}?", "answer": f"answer {i}."} for i in range(turns)]
+
+def test_summary_is_folded_after_the_answer_not_before():
+    release = threading.Event()
+    calls = []
+    
+    def summarize(summary, exchanges):
+        calls.append([exchange["question"] for exchange in exchanges])
+        release.wait(5)
+        return "summary of " + ", ".join(exchange["question"] for exchange in exchanges)
+    
+    memory = ConversationMemory(TokenBudgeter(), summarize, max_turns=2)
+    history = conversation(3)
+    
+    # The exchange that aged out goes verbatim; nothing waits on the model
+    summary, verbatim = memory.split(history)
+    assert summary == ""
+    assert verbatim == history
+    assert calls == []
+    
+    memory.fold_in_background(history)
+    memory.fold_in_background(history)  # Already being folded
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name == "conversation-summary":
+            thread.join(5)
+    assert calls == [["question 0?"]]
+    
+    summary, verbatim = memory.split(history)
+    assert summary == "summary of question 0?"
+    assert verbatim == history[1:]
@@ -0,0 +1,12 @@
+from entropy_engine.normalize import normalize_document
+
+def test_placeholders_survive_tag_stripping():
+    text = "Run ashlar --wallet <WALLET_ADDRESS> and reboot.\n\nThen open <pool-url> in a browser."
+    assert normalize_document(text) == text
+
+def test_html_and_jsx_tags_are_stripped():
+    text = '<div align="center"><b>Flash</b> the board</div>\n\n<Tabs.Item label="Linux">Use <kbd>dd</kbd></Tabs.Item>'
+    assert normalize_document(text) == "Flash the board\n\nUse dd"
+
+def test_markup_in_inline_code_is_kept():
+    assert normalize_document("Pass `<WALLET_ADDRESS>` or `<br/>` verbatim") == "Pass `<WALLET_ADDRESS>` or `<br/>` verbatim"
@@ -0,0 +1,20 @@
+from entropy_engine.corpus import DocsCorpus
+from entropy_engine.router import QueryRouter
+
+DOCS = {
+    "README.md": "# Entropy\n\nEntropy mines useless randomness with Ashlar devices.",
+    "docs/ashlar-setup.md": "# Ashlar setup\n\nConnect the Ashlar to power, then plug the ethernet cable into your router.",
+}
+
+def route(question: str):
+    corpus = DocsCorpus("o", "r")
+    return QueryRouter().route(question, None, corpus.build_index(DOCS))
+
+def test_thanks_needs_a_thanks_word():
+    assert route("ok thanks").reason == "thanks"
+    assert route("cool, thx!").reason == "thanks"
+    assert route("ok").reply is None
+    assert route("cool").reply is None
+
+def test_unfamiliar_wording_goes_to_the_small_tier():
+    assert route("hooking up the box?").tier == "small"
@@ -0,0 +1,37 @@
+from benchmarks.fakes import FakeGitHub
+from entropy_engine.corpus import DocsCorpus
+from entropy_engine.github import DocsFetcher
+from entropy_engine.sources import CorpusSet, load_sources
+
+DOCS = {
+    "README.md": "# Entropy\n\nEntropy mines useless randomness.",
+    "docs/setup.md": "# Setup\n\nPlug the Ashlar into power.",
+}
+
+def test_missing_repository_backs_off_instead_of_blocking():
+    with FakeGitHub(DOCS, "justentropy-lol", "entropy-docs") as github:
+        corpus = DocsCorpus("justentropy-lol", "no-such-repo")
+        fetcher = DocsFetcher(corpus, github.url)
+        assert corpus.get_documents(fetcher.fetch_entropy_docs) == {}
+        calls = github.calls
+        
+        assert corpus.get_documents(fetcher.fetch_entropy_docs) == {}
+        assert github.calls == calls
+        assert corpus.refresh_failures == 1
+
+def test_missing_source_does_not_hold_up_the_others():
+    sources = load_sources([
+        {"name": "docs", "owner": "justentropy-lol", "repo": "entropy-docs"},
+        {"name": "firmware", "owner": "justentropy-lol", "repo": "no-such-repo"},
+    ])
+    with FakeGitHub(DOCS, "justentropy-lol", "entropy-docs") as github:
+        corpus_set = CorpusSet(sources, api_url=github.url)
+        # Nothing is loaded yet, so the first call waits for every source
+        assert set(corpus_set.get_documents()) == set(DOCS)
+        assert corpus_set.is_valid()
+        calls = github.calls
+        
+        for _ in range(3):
+            assert set(corpus_set.get_documents()) == set(DOCS)
+        assert github.calls == calls
+        assert corpus_set.refresh_failures == 1
@@ -0,0 +1,96 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.fakes import FakeGitHub
+from entropy_engine.corpus import DocsCorpus
+from entropy_engine.github import DocsFetcher
+from entropy_engine.webhook import PushWebhook, sign
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SECRET = "entropy-webhook-test-secret"  # The secret push.headers.json was signed with
+
+BEFORE = {
+    "README.md": "# Entropy\n\nEntropy mines useless randomness.",
+    "docs/setup.md": "# Setup\n\nPlug the Ashlar into power.",
+    "docs/faq.md": "# FAQ\n\nIs it useless? Yes.",
+    "assets/ashlar.png": "not a doc",
+}
+# The tree after the recorded push: setup.md modified, flashing.md added, faq.md removed and
+# draft.md added and then removed again
+AFTER = {
+    "README.md": BEFORE["README.md"],
+    "docs/setup.md": "# Setup\n\nPlug the Ashlar into power, then connect it to your router.",
+    "docs/flashing.md": "# Flashing\n\nHold the button while powering on.",
+    "assets/ashlar.png": "still not a doc",
+}
+
+def read_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+@pytest.fixture
+def delivery():
+    headers = json.loads(read_fixture("push.headers.json"))
+    return headers["X-GitHub-Event"], read_fixture("push.json"), headers["X-Hub-Signature-256"]
+
+@pytest.fixture
+def github():
+    with FakeGitHub(BEFORE, "justentropy-lol", "entropy-docs") as server:
+        yield server
+
+@pytest.fixture
+def fetcher(github):
+    fetcher = DocsFetcher(DocsCorpus("justentropy-lol", "entropy-docs", ingest_mode="files"), github.url)
+    assert fetcher.corpus.refresh_now(fetcher.fetch_entropy_docs)
+    return fetcher
+
+def resign(body: bytes, **changes) -> tuple:
+    payload = json.loads(body)
+    payload.update(changes)
+    body = json.dumps(payload).encode('utf-8')
+    return body, sign(SECRET, body)
+
+def test_push_downloads_only_the_files_it_touched(delivery, github, fetcher):
+    corpus = fetcher.corpus
+    event, body, signature = delivery
+    github.set_docs(AFTER)
+    calls = github.calls
+    
+    assert PushWebhook(corpus, fetcher, SECRET).handle(event, body, signature, background=False) == (200, "refreshed")
+    assert corpus.documents == {path: content for path, content in AFTER.items() if path.endswith(".md")}
+    # setup.md and flashing.md from the contents API; no tree listing
+    assert github.calls - calls == 2
+
+def test_bad_signature_is_rejected(delivery, github, fetcher):
+    corpus = fetcher.corpus
+    event, body, signature = delivery
+    documents, calls = corpus.documents, github.calls
+    webhook = PushWebhook(corpus, fetcher, SECRET)
+    
+    assert webhook.handle(event, body, "sha256=" + "0" * 64, background=False)[0] == 401
+    assert webhook.handle(event, body + b" ", signature, background=False)[0] == 401
+    assert PushWebhook(corpus, fetcher, "another-secret").handle(event, body, signature, background=False)[0] == 401
+    assert corpus.documents is documents and github.calls == calls
+
+def test_push_to_another_branch_is_ignored(delivery, github, fetcher):
+    corpus = fetcher.corpus
+    event, body, _ = delivery
+    body, signature = resign(body, ref="refs/heads/preview")
+    documents, calls = corpus.documents, github.calls
+    
+    status, _ = PushWebhook(corpus, fetcher, SECRET).handle(event, body, signature, background=False)
+    assert status == 202
+    assert corpus.documents is documents and github.calls == calls
+
+def test_forced_push_refreshes_from_the_tree(delivery, github, fetcher):
+    corpus = fetcher.corpus
+    event, body, _ = delivery
+    # A force-push can rewrite history the listed commits do not mention
+    rewritten = {"README.md": BEFORE["README.md"], "docs/rewritten.md": "# Rewritten\n\nNew history."}
+    github.set_docs(rewritten)
+    body, signature = resign(body, forced=True)
+    
+    assert PushWebhook(corpus, fetcher, SECRET).handle(event, body, signature, background=False) == (200, "refreshed")
+    assert corpus.documents == rewritten